@@ -0,0 +1,103 @@
+import csv
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+####################################################################################################
+## compiled codelist cache
+# codelists/*.csv are parsed once, by the compile_codelists action, and each stored as its own pickled entry
+# in output/codelists/, keyed by a hash of the CSV's bytes, so any change to the file, including hand edits,
+# invalidates its entry. the extract actions `need` compile_codelists, so the job-runner gives them its outputs,
+# and only the codelists that are actually used get unpickled.
+# if an entry is missing, stale, or can't be read, the codelist is read from the CSV as usual.
+# the extract actions never write entries, as anything they write outside their declared outputs is thrown away.
+
+cache_dir = os.path.join("output", "codelists")
+cache_version = 2
+
+
+def _file_sha(filename):
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _entry_path(filename, column, category_column):
+    name = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(cache_dir, f"{name}.{column}.{category_column}.pickle")
+
+
+def _read_entry(path, sha):
+    try:
+        with open(path, "rb") as f:
+            version, entry_sha, codes = pickle.load(f)
+    except Exception:
+        return None
+    if version != cache_version or entry_sha != sha:
+        return None
+    return codes
+
+
+def _write_entry(path, sha, codes):
+    # write to a temporary file and swap it in, so a reader never sees a partial entry
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump((cache_version, sha, codes), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _parse_csv(filename, column, category_column):
+    # same parsing as cohortextractor's codelist_from_csv, with codes interned and sorted
+    codes = []
+    with open(filename, "r") as f:
+        for row in csv.DictReader(f):
+            code = sys.intern(row[column].strip())
+            if category_column:
+                codes.append((code, sys.intern(row[category_column].strip())))
+            else:
+                codes.append(code)
+    return sorted(codes)
+
+
+def compile_codelist(filename, system, column="code", category_column=None):
+    # write the cache entry for one codelist
+    sha = _file_sha(filename)
+    codes = _parse_csv(filename, column, category_column)
+    _write_entry(_entry_path(filename, column, category_column), sha, codes)
+
+
+def load_codelist(filename, system, column="code", category_column=None):
+    # imported here so that the cache can be compiled without cohort-extractor
+    from cohortextractor import codelist, codelist_from_csv
+
+    try:
+        sha = _file_sha(filename)
+    except OSError:
+        # let cohortextractor report the missing file
+        return codelist_from_csv(
+            filename, system=system, column=column, category_column=category_column
+        )
+
+    codes = _read_entry(_entry_path(filename, column, category_column), sha)
+    if codes is None:
+        codes = _parse_csv(filename, column, category_column)
+
+    if not codes:
+        return codelist_from_csv(
+            filename, system=system, column=column, category_column=category_column
+        )
+    return codelist(codes, system=system)
+
+
+####################################################################################################
+## compile the cache entries for every codelist in codelists.py
+# this is the compile_codelists action: `python:latest analysis/codelist_cache.py`
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import codelists
+
+    for spec in codelists.csv_codelists.values():
+        compile_codelist(**spec)
+    print(f"compiled {len(codelists.csv_codelists)} codelists to {cache_dir}")
@@ -0,0 +1,441 @@
+# # # # # # # # # # # # # # # # # # # # #
+# This script:
+# generates a dummy dataset for a study definition directly from its `return_expectations`
+# (and the study's `default_expectations`), with each column generated in bulk with numpy,
+# and writes it to a feather file
+#
+# this is used to produce large synthetic cohorts for load-testing the downstream R actions.
+# the hand-built dummy data in dummydata.R, which encodes relationships between variables,
+# is still used for the dummy-data run of the project pipeline
+#
+# usage, from the project root:
+# python analysis/dummy/dummydata.py \
+#   --study-definition study_definition_treated \
+#   --param cohort=over12 --param vaxn=1 \
+#   --rows 10000000 --chunk-size 250000 \
+#   --output output/dummy/input_treated.feather
+# # # # # # # # # # # # # # # # # # # # #
+
+import argparse
+import datetime
+import importlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+############################################################
+## expectations
+
+# date functions whose output is a date unless `returning` says otherwise
+date_returning = (
+    "date",
+    "date_of",
+    "date_admitted",
+    "date_discharged",
+    "date_arrived",
+)
+
+# `on_or_after`/`between` referring to another variable, eg "covid_vax_any_1_date + 1 day"
+reference_pattern = re.compile(r"^\s*(\w+)\s*(?:\+\s*(\d+)\s*days?)?\s*$")
+
+
+def resolve_date(value, index_date):
+    # turn an expectations date into a date
+    # eg "2021-01-01", "index_date", "index_date + 7 days", "today"
+    value = str(value).strip()
+    if value == "today":
+        return datetime.date.today()
+    match = re.match(r"^index_date\s*(?:([+-])\s*(\d+)\s*days?)?$", value)
+    if match:
+        date = datetime.date.fromisoformat(index_date)
+        if match.group(1):
+            days = int(match.group(2))
+            date += datetime.timedelta(days=days if match.group(1) == "+" else -days)
+        return date
+    return datetime.date.fromisoformat(value[:10])
+
+
+# returning values that are codes or labels from a small set, rather than flags
+category_returning = (
+    "category",
+    "admission_method",
+    "primary_diagnosis",
+    "discharge_destination",
+    "source_of_admission",
+)
+
+
+def aggregate_sources(kwargs, variables):
+    # (funcname, kwargs) of each column a `minimum_of`/`maximum_of` aggregates,
+    # whether it's a variable of the study or defined within the call
+    extra_columns = kwargs.get("extra_columns") or {}
+    return [
+        extra_columns[name] if name in extra_columns else variables[name]
+        for name in kwargs["column_names"]
+    ]
+
+
+def column_kind(funcname, kwargs, variables=None):
+    # the kind of column this variable returns: "date", "category", "int", "float" or "bool"
+    # `satisfying` is a `categorised_as` 1 or 0, with category expectations of its own, and returns a flag
+    if funcname == "categorised_as" and set(kwargs["category_definitions"]) == {0, 1}:
+        return "bool"
+
+    own = kwargs.get("return_expectations") or {}
+    for kind in ("category", "date", "int", "float", "bool"):
+        if kind in own:
+            return kind
+
+    # `minimum_of`/`maximum_of` don't take expectations, and return the same kind as their source columns
+    if funcname == "aggregate_of":
+        funcname, kwargs = aggregate_sources(kwargs, variables or {})[0]
+        return column_kind(funcname, kwargs, variables)
+
+    returning = kwargs.get("returning") or ""
+    if funcname == "categorised_as" or returning in category_returning:
+        return "category"
+    if funcname == "with_value_from_file":
+        return {"date": "date", "int": "int", "float": "float"}.get(
+            kwargs.get("returning_type"), "category"
+        )
+    if (
+        funcname == "age_as_of"
+        or returning.startswith("number_of")
+        or "count" in returning
+        or returning == "days_in_critical_care"
+    ):
+        return "int"
+    if returning in ("numeric_value", "float"):
+        return "float"
+    if returning in date_returning or returning.startswith("date_"):
+        return "date"
+    # `date_format` is passed to every query by the query helpers in variables_functions.py,
+    # so it only marks a date when nothing is being returned other than the function's default
+    if not returning and kwargs.get("date_format"):
+        return "date"
+    return "bool"
+
+
+def variable_references(kwargs, variables):
+    # the date variable this variable's period starts from, and the gap after it
+    on_or_after = kwargs.get("on_or_after")
+    if on_or_after is None and kwargs.get("between"):
+        on_or_after = kwargs["between"][0]
+    if not isinstance(on_or_after, str):
+        return None, 0
+    match = reference_pattern.match(on_or_after)
+    if match and match.group(1) in variables:
+        return match.group(1), int(match.group(2) or 0)
+    return None, 0
+
+
+############################################################
+## column generators
+
+
+def generate_missing(rng, n, expectations):
+    incidence = expectations.get("incidence", 1)
+    if expectations.get("rate") == "universal":
+        incidence = 1
+    return rng.random(n) >= incidence
+
+
+def generate_dates(rng, n, expectations, index_date, after=None, after_gap=0):
+    date_expectations = expectations.get("date", {})
+    earliest = resolve_date(date_expectations.get("earliest", "1900-01-01"), index_date)
+    latest = resolve_date(date_expectations.get("latest", "today"), index_date)
+    lo = np.full(n, np.datetime64(earliest, "D").astype(np.int64))
+    hi = np.datetime64(latest, "D").astype(np.int64)
+
+    missing = generate_missing(rng, n, expectations)
+
+    if after is not None:
+        # a later event in a sequence: on or after the event it's chained on, and missing if that is missing
+        missing |= np.isnat(after)
+        after_days = np.where(np.isnat(after), lo, after.astype(np.int64) + after_gap)
+        lo = np.maximum(lo, after_days)
+        missing |= lo > hi
+
+    span = np.maximum(hi - lo, 0)
+    if expectations.get("rate") == "exponential_increase":
+        # more events closer to the latest date
+        gap = rng.exponential(np.maximum(span, 1) / 4)
+        offset = span - np.minimum(gap, span).astype(np.int64)
+    else:
+        offset = (rng.random(n) * (span + 1)).astype(np.int64)
+
+    days = (lo + offset).astype("datetime64[D]")
+    days[missing] = np.datetime64("NaT")
+    return days
+
+
+def category_levels(funcname, kwargs, expectations):
+    # every category the variable can take, in the order they're defined:
+    # the `categorised_as` keys, then any others given in the expectations' ratios
+    levels = []
+    if funcname == "categorised_as":
+        levels = [str(category) for category in kwargs["category_definitions"]]
+    ratios = expectations.get("category", {}).get("ratios", {})
+    levels += [str(category) for category in ratios if str(category) not in levels]
+    return levels
+
+
+def dictionary_index_type(n_levels):
+    # the narrowest integer type that can index the categories
+    for index_type in (pa.int8(), pa.int16()):
+        if n_levels <= np.iinfo(index_type.to_pandas_dtype()).max:
+            return index_type
+    return pa.int32()
+
+
+def generate_category(rng, n, expectations, levels):
+    # categories are written as dictionary-encoded columns, with every level in the dictionary
+    # whether or not it is generated, so that they are read into R as factors with the full set of levels
+    ratios = expectations.get("category", {}).get("ratios", {})
+    ratios = {str(category): ratio for category, ratio in ratios.items()}
+    categories = list(levels) or [""]
+    p = np.array([ratios.get(category, 0) for category in categories], dtype=float)
+    if p.sum() == 0:
+        p[:] = 1
+    indices = rng.choice(len(categories), size=n, p=p / p.sum())
+    # missing categories are the empty string, as in cohort-extractor output.
+    # it's in the dictionary whenever it could be generated, so every chunk of a dataset has the same dictionary
+    missing = generate_missing(rng, n, expectations)
+    may_be_missing = (
+        expectations.get("rate") != "universal"
+        and expectations.get("incidence", 1) < 1
+    )
+    if may_be_missing and "" not in categories:
+        categories.append("")
+    if missing.any():
+        indices[missing] = categories.index("")
+    index_type = dictionary_index_type(len(categories))
+    return pa.DictionaryArray.from_arrays(
+        pa.array(indices.astype(index_type.to_pandas_dtype()), type=index_type),
+        pa.array(categories, type=pa.string()),
+    )
+
+
+def generate_number(rng, n, expectations, kind):
+    spec = expectations[kind]
+    if spec.get("distribution") == "population_ages":
+        values = rng.integers(0, 100, size=n)
+    else:
+        values = rng.normal(spec.get("mean", 0), spec.get("stddev", 1), size=n)
+    missing = generate_missing(rng, n, expectations)
+    values = np.where(missing, 0, values)
+    if kind == "int":
+        return np.maximum(np.round(values), 0).astype(np.int32)
+    return values.astype(np.float64)
+
+
+############################################################
+## dataset
+
+
+def study_variables(study):
+    # (funcname, kwargs) for every variable of the study definition, in order, and the hidden ones
+    variables = getattr(study, "covariate_definitions", None) or getattr(
+        study, "_original_covariates"
+    )
+    hidden = set(getattr(study, "hidden_columns", []))
+    variables = {
+        name: (definition[0], definition[1])
+        for name, definition in variables.items()
+        if name != "population"
+    }
+    return variables, hidden
+
+
+def generate_dataset(study, n, seed, index_date, first_patient_id=1):
+    rng = np.random.default_rng(seed)
+    default_expectations = getattr(study, "default_expectations", None) or {}
+    variables, hidden = study_variables(study)
+
+    columns = {
+        "patient_id": np.arange(first_patient_id, first_patient_id + n, dtype=np.int64)
+    }
+
+    def generate(name):
+        # generate a variable after the date variable it is chained on, if any
+        if name in columns:
+            return columns[name]
+        funcname, kwargs = variables[name]
+        expectations = {
+            **default_expectations,
+            **(kwargs.get("return_expectations") or {}),
+        }
+        kind = column_kind(funcname, kwargs, variables)
+
+        if funcname == "aggregate_of":
+            columns[name] = generate_aggregate(name, kwargs)
+        elif funcname == "fixed_value":
+            value = kwargs["value"]
+            if isinstance(value, str) and re.match(r"^\d{4}-\d{2}-\d{2}$", value):
+                value = np.datetime64(value, "D")
+            columns[name] = np.full(n, value)
+        elif kind == "date":
+            after, gap = variable_references(kwargs, variables)
+            columns[name] = generate_dates(
+                rng,
+                n,
+                expectations,
+                index_date,
+                after=generate(after) if after is not None else None,
+                after_gap=gap,
+            )
+        elif kind == "category":
+            columns[name] = generate_category(
+                rng, n, expectations, category_levels(funcname, kwargs, expectations)
+            )
+        elif kind in ("int", "float"):
+            columns[name] = generate_number(rng, n, expectations, kind)
+        elif funcname == "categorised_as" and kwargs["category_definitions"][1] in variables:
+            # a flag `satisfying` just another flag, such as a repeated query's alias, is that flag
+            columns[name] = generate(kwargs["category_definitions"][1])
+        else:
+            columns[name] = ~generate_missing(
+                rng, n, {"incidence": expectations.get("incidence", 0.5)}
+            )
+        return columns[name]
+
+    def generate_aggregate(name, kwargs):
+        # as in cohort-extractor, the minimum or maximum of the source columns' dummy values, ignoring missing ones.
+        # columns defined within the call are generated as hidden variables of their own
+        extra_columns = kwargs.get("extra_columns") or {}
+        for column, definition in extra_columns.items():
+            variables.setdefault(column, definition)
+            hidden.add(column)
+        values = [generate(column) for column in kwargs["column_names"]]
+        if kwargs["aggregate_function"] == "MIN":
+            return np.fmin.reduce(values)
+        return np.fmax.reduce(values)
+
+    for name in list(variables):
+        generate(name)
+
+    # hidden variables are only generated so that the variables chained on them can be
+    return pa.table(
+        {
+            name: pa.array(values)
+            for name, values in columns.items()
+            if name not in hidden
+        }
+    )
+
+
+############################################################
+## chunked writer
+# large datasets are generated and written a chunk of patients at a time, so memory use depends on
+# the chunk size rather than the number of rows.
+# each finished chunk is written to its own file in {output}.parts/ and recorded in {output}.progress.json,
+# so that a run that's interrupted carries on from the last finished chunk when it's started again
+# with the same arguments. once every chunk is written, they're streamed into the output file.
+
+
+def read_progress(path, settings):
+    # chunks already written by an earlier run with the same settings
+    try:
+        with open(path) as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return progress["completed"] if progress["settings"] == settings else []
+
+
+def write_progress(path, settings, completed):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(dict(settings=settings, completed=completed), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_dataset_chunked(study, rows, chunk_size, seed, index_date, output):
+    parts_dir = f"{output}.parts"
+    progress_path = f"{output}.progress.json"
+    settings = dict(rows=rows, chunk_size=chunk_size, seed=seed, index_date=index_date)
+    os.makedirs(parts_dir, exist_ok=True)
+
+    n_chunks = max(-(-rows // chunk_size), 1)
+    part_paths = [
+        os.path.join(parts_dir, f"part-{chunk:05d}.feather") for chunk in range(n_chunks)
+    ]
+    completed = [
+        chunk
+        for chunk in read_progress(progress_path, settings)
+        if os.path.exists(part_paths[chunk])
+    ]
+
+    for chunk in range(n_chunks):
+        if chunk in completed:
+            continue
+        start = chunk * chunk_size
+        table = generate_dataset(
+            study,
+            n=min(chunk_size, rows - start),
+            # each chunk has its own random stream, so the result doesn't depend on where a run was resumed
+            seed=[seed, chunk],
+            index_date=index_date,
+            first_patient_id=start + 1,
+        )
+        feather.write_feather(table, part_paths[chunk])
+        completed.append(chunk)
+        write_progress(progress_path, settings, completed)
+        print(f"chunk {chunk + 1} of {n_chunks} written")
+
+    # stream the chunks into one file, holding one chunk in memory at a time
+    schema = feather.read_table(part_paths[0], memory_map=True).schema
+    with pa.ipc.new_file(
+        output, schema, options=pa.ipc.IpcWriteOptions(compression="lz4")
+    ) as writer:
+        for path in part_paths:
+            for batch in feather.read_table(path, memory_map=True).to_batches():
+                writer.write_batch(batch)
+
+    shutil.rmtree(parts_dir)
+    os.remove(progress_path)
+    return n_chunks
+
+
+############################################################
+## command-line interface
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--study-definition", required=True)
+    parser.add_argument("--param", action="append", default=[])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=250000)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    # study definitions read their parameters from cohortextractor's `params`
+    # and expect to be imported from the project root, with analysis/ on the path
+    import cohortextractor
+
+    params = dict(param.split("=", 1) for param in args.param)
+    cohortextractor.params.update(params)
+    sys.path.insert(0, os.path.join(os.getcwd(), "analysis"))
+    study = importlib.import_module(args.study_definition).study
+
+    start = time.time()
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    n_chunks = write_dataset_chunked(
+        study,
+        rows=args.rows,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        index_date=params.get("index_date") or getattr(study, "index_date", "2021-01-01"),
+        output=args.output,
+    )
+    print(
+        f"wrote {args.rows} rows in {n_chunks} chunks "
+        f"to {args.output} in {time.time() - start:.1f}s"
+    )
@@ -27,16 +27,8 @@ with open("./lib/design/study-dates.json") as f:
 end_date = study_dates[cohort][f"end_date{vaxn}"]
 index_date = study_dates[cohort][f"start_date{vaxn}"]
 
-study = StudyDefinition(
-    # Configure the expectations framework
-    default_expectations={
-        "date": {"earliest": "2020-01-01", "latest": end_date},
-        "rate": "uniform",
-        "incidence": 0.2,
-        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
-        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
-    },
-    index_date=index_date,  # this shouldn't be used anywhere!
+# study population and variables
+study_variables = dict(
     population=patients.which_exist_in_file(
         f_path=f"output/{cohort}/vax{vaxn}/carditis_severity/{carditis_type}carditis_dates.csv"
     ),
@@ -48,20 +40,26 @@ study = StudyDefinition(
     ),
     **admitted_to_hospital_X(
         n=3,
-        with_admission_method=[
-            "21",
-            "22",
-            "23",
-            "24",
-            "25",
-            "2A",
-            "2B",
-            "2C",
-            "2D",
-            "28",
-        ],
+        with_admission_method=emergency_admission_method,
         on_or_after="carditis_date",
         end_date=end_date,
     ),
     **carditis_emergency_X(carditis_type=carditis_type, on_or_after="carditis_date"),
 )
+
+study = StudyDefinition(
+    # Configure the expectations framework
+    default_expectations={
+        "date": {"earliest": "2020-01-01", "latest": end_date},
+        "rate": "uniform",
+        "incidence": 0.2,
+        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
+        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
+    },
+    index_date=index_date,  # this shouldn't be used anywhere!
+    **study_variables,
+)
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_carditis_severity")
+print_query_counts("study_definition_carditis_severity", study_variables)
@@ -17,12 +17,20 @@ from cohortextractor import (
     params,
 )
 
-from variables_outcome import vaccination_date_X
+from variables_functions import (
+    vaccination_date_X,
+    deduplicate_variables,
+    values_from_file_X,
+    print_query_counts,
+)
 
 cohort = params["cohort"]
 matching_round = params["matching_round"]
 vaxn = int(params["vaxn"])
 
+# patient_id, trial_date and match_id of the controls matched in this round's potential matching
+matchedcontrols_path = f"output/{cohort}/vax{vaxn}/matchround{matching_round}/potential/potential_matchedcontrols.csv.gz"
+
 # import study dates defined in "./analysis/design.R" script
 with open("./lib/design/study-dates.json") as f:
     study_dates = json.load(f)
@@ -60,17 +68,8 @@ matching_variables = generate_matching_variables(baseline_date="trial_date")
 ############################################################
 
 
-# Specify study defeinition
-study = StudyDefinition(
-    # Configure the expectations framework
-    default_expectations={
-        "date": {"earliest": "2020-01-01", "latest": end_date},
-        "rate": "uniform",
-        "incidence": 0.2,
-        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
-        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
-    },
-    index_date="2020-01-01",  # this shouldn't be used anywhere!
+# study population and variables
+study_variables = dict(
     # This line defines the study population
     # FIXME this line needs to be matching_round specific -- currently it's only using data from matching_round=1
     # might be necessary to have round-specific study definitions which is a pain, but metaprogrammable.
@@ -104,46 +103,57 @@ study = StudyDefinition(
         covid_vax_any_0_date=patients.fixed_value(start_date_0),
         covid_vax_pfizerA_0_date=patients.fixed_value(start_date_0),
         covid_vax_pfizerC_0_date=patients.fixed_value(start_date_0),
-        prematched=patients.which_exist_in_file(
-            f_path=f"output/{cohort}/vax{vaxn}/matchround{matching_round}/potential/potential_matchedcontrols.csv.gz"
-        ),
-    ),
-    trial_date=patients.with_value_from_file(
-        f_path=f"output/{cohort}/vax{vaxn}/matchround{matching_round}/potential/potential_matchedcontrols.csv.gz",
-        returning="trial_date",
-        returning_type="date",
-        date_format="YYYY-MM-DD",
-    ),
-    match_id=patients.with_value_from_file(
-        f_path=f"output/{cohort}/vax{vaxn}/matchround{matching_round}/potential/potential_matchedcontrols.csv.gz",
-        returning="match_id",
-        returning_type="int",
-    ),
-    **vaccination_date_X(
-        name="covid_vax_any",
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        target_disease_matches="SARS-2 CORONAVIRUS",
+        prematched=patients.which_exist_in_file(f_path=matchedcontrols_path),
     ),
-    # pfizer
-    **vaccination_date_X(
-        name="covid_vax_pfizerA",
-        # use 1900 to capture all possible recorded covid vaccinations, including date errors
-        # any vaccines occurring before national rollout are later excluded
-        on_or_after="1900-01-01",
-        n=2,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
-    ),
-    # pfizer approved for use in children (5-11)
-    **vaccination_date_X(
-        name="covid_vax_pfizerC",
-        on_or_after="1900-01-01",
-        n=2,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
+    **values_from_file_X(matchedcontrols_path, trial_date="date", match_id="int"),
+    **deduplicate_variables(
+        "study_definition_controlactual",
+        dict(
+            **vaccination_date_X(
+                name="covid_vax_any",
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                target_disease_matches="SARS-2 CORONAVIRUS",
+            ),
+            # pfizer
+            **vaccination_date_X(
+                name="covid_vax_pfizerA",
+                # use 1900 to capture all possible recorded covid vaccinations, including date errors
+                # any vaccines occurring before national rollout are later excluded
+                on_or_after="1900-01-01",
+                n=2,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
+            ),
+            # pfizer approved for use in children (5-11)
+            **vaccination_date_X(
+                name="covid_vax_pfizerC",
+                on_or_after="1900-01-01",
+                n=2,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
+            ),
+            **inclusion_variables,
+            **matching_variables,
+        ),
     ),
-    **inclusion_variables,
-    **matching_variables,
 )
+
+# Specify study defeinition
+study = StudyDefinition(
+    # Configure the expectations framework
+    default_expectations={
+        "date": {"earliest": "2020-01-01", "latest": end_date},
+        "rate": "uniform",
+        "incidence": 0.2,
+        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
+        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
+    },
+    index_date="2020-01-01",  # this shouldn't be used anywhere!
+    **study_variables,
+)
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_controlactual")
+print_query_counts("study_definition_controlactual", study_variables)
@@ -17,13 +17,21 @@ from cohortextractor import (
     params,
 )
 
-from variables_outcome import vaccination_date_X
+from variables_functions import (
+    vaccination_date_X,
+    deduplicate_variables,
+    values_from_file_X,
+    print_query_counts,
+)
 
 
 cohort = params["cohort"]
 n_matching_rounds = params["n_matching_rounds"]
 vaxn = params["vaxn"]
 
+# patient_id, trial_date and match_id of every control matched across all matching rounds
+matchedcontrols_path = f"output/{cohort}/vax{vaxn}/matchround{n_matching_rounds}/actual/cumulative_matchedcontrols.csv.gz"
+
 # import study dates defined in "./analysis/design.R" script
 with open("./lib/design/study-dates.json") as f:
     study_dates = json.load(f)
@@ -58,6 +66,26 @@ outcome_variables = generate_outcome_variables(
 ############################################################
 
 
+# study population and variables
+study_variables = dict(
+    # This line defines the study population
+    population=patients.which_exist_in_file(f_path=matchedcontrols_path),
+    **values_from_file_X(matchedcontrols_path, trial_date="date", match_id="int"),
+    **deduplicate_variables(
+        "study_definition_controlfinal",
+        dict(
+            ###############################################################################
+            # matching
+            ##############################################################################
+            # **matching_variables,
+            ###############################################################################
+            # outcomes
+            ##############################################################################
+            **outcome_variables,
+        ),
+    ),
+)
+
 # Specify study defeinition
 study = StudyDefinition(
     # Configure the expectations framework
@@ -69,27 +97,9 @@ study = StudyDefinition(
         "float": {"distribution": "normal", "mean": 25, "stddev": 5},
     },
     index_date=start_date,
-    # This line defines the study population
-    population=patients.which_exist_in_file(
-        f_path=f"output/{cohort}/vax{vaxn}/matchround{n_matching_rounds}/actual/cumulative_matchedcontrols.csv.gz"
-    ),
-    trial_date=patients.with_value_from_file(
-        f_path=f"output/{cohort}/vax{vaxn}/matchround{n_matching_rounds}/actual/cumulative_matchedcontrols.csv.gz",
-        returning="trial_date",
-        returning_type="date",
-        date_format="YYYY-MM-DD",
-    ),
-    match_id=patients.with_value_from_file(
-        f_path=f"output/{cohort}/vax{vaxn}/matchround{n_matching_rounds}/actual/cumulative_matchedcontrols.csv.gz",
-        returning="match_id",
-        returning_type="int",
-    ),
-    ###############################################################################
-    # matching
-    ##############################################################################
-    # **matching_variables,
-    ###############################################################################
-    # outcomes
-    ##############################################################################
-    **outcome_variables,
+    **study_variables,
 )
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_controlfinal")
+print_query_counts("study_definition_controlfinal", study_variables)
@@ -17,7 +17,11 @@ from cohortextractor import (
     params,
 )
 
-from variables_outcome import vaccination_date_X
+from variables_functions import (
+    vaccination_date_X,
+    deduplicate_variables,
+    print_query_counts,
+)
 
 cohort = params["cohort"]
 vaxn = int(params["vaxn"])
@@ -61,19 +65,24 @@ from variables_matching import generate_matching_variables
 
 matching_variables = generate_matching_variables(baseline_date="index_date")
 ############################################################
+## previously matched controls
+# anyone already matched as a control in a previous round can't be matched again,
+# so leave them out of the extract rather than re-extracting the whole eligible population every round.
+# each round's file holds only that round's matched controls
+previouslymatched_variables = {
+    f"previouslymatched_{previousround}": patients.which_exist_in_file(
+        f_path=f"output/{cohort}/vax{vaxn}/matchround{previousround}/actual/matchedcontrols.csv.gz"
+    )
+    for previousround in range(1, previousmatching_round + 1)
+}
+previouslymatched_criterion = "".join(
+    f" AND (NOT {name})" for name in previouslymatched_variables
+)
+############################################################
 
 
-# Specify study defeinition
-study = StudyDefinition(
-    # Configure the expectations framework
-    default_expectations={
-        "date": {"earliest": "2020-01-01", "latest": end_date},
-        "rate": "uniform",
-        "incidence": 0.2,
-        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
-        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
-    },
-    index_date=index_date,
+# study population and variables
+study_variables = dict(
     # This line defines the study population
     population=patients.satisfying(
         f"""
@@ -92,9 +101,10 @@ study = StudyDefinition(
       (covid_vax_any_{vaxn-1}_date <= end_date_{vaxn-1})
       AND 
       (covid_vax_any_{vaxn-1}_date = covid_vax_{treatment}_{vaxn-1}_date)
+      {previouslymatched_criterion}
     """,
         # NOTE: all ..._0_date variables are set to be equal so that for vaxn=1 the vaxn-1 logic is true
-        # previouslymatched = patients.which_exist_in_file(f_path="output/match/cumulative_matchedcontrols{matching_round}.csv.gz"),
+        **previouslymatched_variables,
         start_date_0=patients.fixed_value(start_date_0),
         end_date_0=patients.fixed_value(end_date_0),
         start_date_1=patients.fixed_value(start_date_1),
@@ -105,31 +115,54 @@ study = StudyDefinition(
         covid_vax_pfizerA_0_date=patients.fixed_value(start_date_0),
         covid_vax_pfizerC_0_date=patients.fixed_value(start_date_0),
     ),
-    **vaccination_date_X(
-        name="covid_vax_any",
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        target_disease_matches="SARS-2 CORONAVIRUS",
-    ),
-    # pfizer
-    **vaccination_date_X(
-        name="covid_vax_pfizerA",
-        # use 1900 to capture all possible recorded covid vaccinations, including date errors
-        # any vaccines occurring before national rollout are later excluded
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
+    **deduplicate_variables(
+        "study_definition_controlpotential",
+        dict(
+            **vaccination_date_X(
+                name="covid_vax_any",
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                target_disease_matches="SARS-2 CORONAVIRUS",
+            ),
+            # pfizer
+            **vaccination_date_X(
+                name="covid_vax_pfizerA",
+                # use 1900 to capture all possible recorded covid vaccinations, including date errors
+                # any vaccines occurring before national rollout are later excluded
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
+            ),
+            # pfizer approved for use in children (5-11)
+            **vaccination_date_X(
+                name="covid_vax_pfizerC",
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
+            ),
+            **inclusion_variables,
+            **matching_variables,
+        ),
     ),
-    # pfizer approved for use in children (5-11)
-    **vaccination_date_X(
-        name="covid_vax_pfizerC",
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
-    ),
-    **inclusion_variables,
-    **matching_variables,
 )
+
+# Specify study defeinition
+study = StudyDefinition(
+    # Configure the expectations framework
+    default_expectations={
+        "date": {"earliest": "2020-01-01", "latest": end_date},
+        "rate": "uniform",
+        "incidence": 0.2,
+        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
+        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
+    },
+    index_date=index_date,
+    **study_variables,
+)
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_controlpotential")
+print_query_counts("study_definition_controlpotential", study_variables)
@@ -18,6 +18,14 @@ cohort = params["cohort"]
 vaxn = params["vaxn"]
 arm = params["arm"]
 
+# patient_id and trial_date of the matched people in this arm
+matched_path = f"output/{cohort}/vax{vaxn}/match/data_matched_{arm}.csv.gz"
+
+from variables_functions import (
+    values_from_file_X,
+    print_query_counts,
+)
+
 ############################################################
 ## tests
 from variables_covidtests import generate_covidtests_variables
@@ -26,6 +34,17 @@ covidtests_variables = generate_covidtests_variables(index_date="trial_date")
 ############################################################
 
 
+# study population and variables
+study_variables = dict(
+    # This line defines the study population
+    population=patients.which_exist_in_file(f_path=matched_path),
+    **values_from_file_X(matched_path, trial_date="date"),
+    ###############################################################################
+    # covariates
+    ##############################################################################
+    **covidtests_variables,
+)
+
 # Specify study defeinition
 study = StudyDefinition(
     # Configure the expectations framework
@@ -36,18 +55,9 @@ study = StudyDefinition(
         "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
         "float": {"distribution": "normal", "mean": 25, "stddev": 5},
     },
-    # This line defines the study population
-    population=patients.which_exist_in_file(
-        f_path=f"output/{cohort}/vax{vaxn}/match/data_matched_{arm}.csv.gz"
-    ),
-    trial_date=patients.with_value_from_file(
-        f_path=f"output/{cohort}/vax{vaxn}/match/data_matched_{arm}.csv.gz",
-        returning="trial_date",
-        returning_type="date",
-        date_format="YYYY-MM-DD",
-    ),
-    ###############################################################################
-    # covariates
-    ##############################################################################
-    **covidtests_variables,
+    **study_variables,
 )
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_covidtests")
+print_query_counts("study_definition_covidtests", study_variables)
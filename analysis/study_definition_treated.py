@@ -17,7 +17,11 @@ from cohortextractor import (
     params,
 )
 
-from variables_outcome import vaccination_date_X
+from variables_functions import (
+    vaccination_date_X,
+    deduplicate_variables,
+    print_query_counts,
+)
 
 cohort = params["cohort"]
 vaxn = int(params["vaxn"])
@@ -69,17 +73,8 @@ outcome_variables = generate_outcome_variables(
 ############################################################
 
 
-# Specify study defeinition
-study = StudyDefinition(
-    # Configure the expectations framework
-    default_expectations={
-        "date": {"earliest": "2020-01-01", "latest": end_date},
-        "rate": "uniform",
-        "incidence": 0.2,
-        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
-        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
-    },
-    index_date=start_date,
+# study population and variables
+study_variables = dict(
     # This line defines the study population
     population=patients.satisfying(
         f"""
@@ -113,41 +108,64 @@ study = StudyDefinition(
         covid_vax_pfizerA_0_date=patients.fixed_value(start_date_0),
         covid_vax_pfizerC_0_date=patients.fixed_value(start_date_0),
     ),
-    **vaccination_date_X(
-        name="covid_vax_any",
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        target_disease_matches="SARS-2 CORONAVIRUS",
-    ),
-    # pfizer
-    **vaccination_date_X(
-        name="covid_vax_pfizerA",
-        # use 1900 to capture all possible recorded covid vaccinations, including date errors
-        # any vaccines occurring before national rollout are later excluded
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
-    ),
-    # pfizer approved for use in children (5-11)
-    **vaccination_date_X(
-        name="covid_vax_pfizerC",
-        on_or_after="1900-01-01",
-        n=3,
-        delay=1,
-        product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
+    **deduplicate_variables(
+        "study_definition_treated",
+        dict(
+            **vaccination_date_X(
+                name="covid_vax_any",
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                target_disease_matches="SARS-2 CORONAVIRUS",
+            ),
+            # pfizer
+            **vaccination_date_X(
+                name="covid_vax_pfizerA",
+                # use 1900 to capture all possible recorded covid vaccinations, including date errors
+                # any vaccines occurring before national rollout are later excluded
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty 30micrograms/0.3ml dose conc for susp for inj MDV (Pfizer)",
+            ),
+            # pfizer approved for use in children (5-11)
+            **vaccination_date_X(
+                name="covid_vax_pfizerC",
+                on_or_after="1900-01-01",
+                n=3,
+                delay=1,
+                product_name_matches="COVID-19 mRNA Vaccine Comirnaty Children 5-11yrs 10mcg/0.2ml dose conc for disp for inj MDV (Pfizer)",
+            ),
+            ##############################################################################
+            # inclusion
+            ##############################################################################
+            **inclusion_variables,
+            ###############################################################################
+            # matching
+            ##############################################################################
+            **matching_variables,
+            ###############################################################################
+            # outcomes
+            ##############################################################################
+            **outcome_variables,
+        ),
     ),
-    ##############################################################################
-    # inclusion
-    ##############################################################################
-    **inclusion_variables,
-    ###############################################################################
-    # matching
-    ##############################################################################
-    **matching_variables,
-    ###############################################################################
-    # outcomes
-    ##############################################################################
-    **outcome_variables,
 )
+
+# Specify study defeinition
+study = StudyDefinition(
+    # Configure the expectations framework
+    default_expectations={
+        "date": {"earliest": "2020-01-01", "latest": end_date},
+        "rate": "uniform",
+        "incidence": 0.2,
+        "int": {"distribution": "normal", "mean": 1000, "stddev": 100},
+        "float": {"distribution": "normal", "mean": 25, "stddev": 5},
+    },
+    index_date=start_date,
+    **study_variables,
+)
+
+# list the codelists and database queries used by this study definition in the action log
+codelists.report_accessed("study_definition_treated")
+print_query_counts("study_definition_treated", study_variables)
@@ -1,5 +1,4 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import codelists
 import pandas as pd
 
@@ -1,5 +1,4 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import codelists
 
 ############################################################
@@ -62,20 +61,18 @@ def generate_covidtests_variables(index_date):
             returning="date",
         ),
         # date of first positive test (to match to case category vars, after index date only)
-        firstpostest_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            on_or_after=index_date,
-            test_result="positive",
+        firstpostest_date=sgss_query(
+            "date",
+            "positive",
             restrict_to_earliest_specimen_date=True,
-            returning="date",
+            on_or_after=index_date,
         ),
         # case-category of first positive test (after index date only)
-        firstpostest_category=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            on_or_after=index_date,
-            test_result="positive",
+        firstpostest_category=sgss_query(
+            "case_category",
+            "positive",
             restrict_to_earliest_specimen_date=True,
-            returning="case_category",
+            on_or_after=index_date,
             return_expectations={
                 "incidence": 1,
                 # not using study def dummy data, but returns error without stating expectations
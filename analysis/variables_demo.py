@@ -1,5 +1,4 @@
 from cohortextractor import patients
-from codelists import *
 import codelists
 
 
@@ -1,7 +1,24 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import codelists
 
+####################################################################################################
+## emergency hospital admission methods
+# see https://github.com/opensafely-core/cohort-extractor/pull/497 for codes
+# see https://docs.opensafely.org/study-def-variables/#sus for more info
+emergency_admission_method = [
+    "21",
+    "22",
+    "23",
+    "24",
+    "25",
+    "2A",
+    "2B",
+    "2C",
+    "2D",
+    "28",
+]
+
+
 ####################################################################################################
 ## function to add days to a string date
 from datetime import datetime, timedelta
@@ -15,14 +32,34 @@ def days(datestring, days):
     return datestring_add
 
 
+####################################################################################################
+# sequence of n recurring events, where event i is the first event on or after the anchor of event i-1
+# `signature(i, on_or_after)` returns the variables for the i-th event
+# `anchor(i)` returns the name of the date variable that the (i+1)-th event is chained on
+# all the *_X sequence generators below are built on this, so that the chaining logic lives in one place
+def event_sequence_X(signature, on_or_after, n, anchor, delay=1):
+    variables = dict()
+    for i in range(1, n + 1):
+        variables.update(signature(i, on_or_after))
+        # pick up subsequent events occurring `delay` days or later
+        on_or_after = f"{anchor(i)} + {delay} {'day' if delay == 1 else 'days'}"
+    return variables
+
+
 ####################################################################################################
 def vaccination_date_X(
-    name, index_date, n, product_name_matches=None, target_disease_matches=None
+    name,
+    on_or_after,
+    n,
+    delay=1,
+    product_name_matches=None,
+    target_disease_matches=None,
 ):
     # vaccination date, given product_name
-    def var_signature(name, on_or_after, product_name_matches, target_disease_matches):
+    # people with unrealistic dosing intervals are later excluded
+    def var_signature(i, on_or_after):
         return {
-            name: patients.with_tpp_vaccination_record(
+            f"{name}_{i}_date": patients.with_tpp_vaccination_record(
                 product_name_matches=product_name_matches,
                 target_disease_matches=target_disease_matches,
                 on_or_after=on_or_after,
@@ -32,59 +69,85 @@ def vaccination_date_X(
             ),
         }
 
-    variables = var_signature(
-        f"{name}_1_date", index_date, product_name_matches, target_disease_matches
+    return event_sequence_X(
+        var_signature,
+        on_or_after=on_or_after,
+        n=n,
+        anchor=lambda i: f"{name}_{i}_date",
+        delay=delay,
     )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                f"{name}_{i}_date",
-                f"{name}_{i-1}_date + 1 days",
-                # pick up subsequent vaccines occurring one day or later -- people with unrealistic dosing intervals are later excluded
-                product_name_matches,
-                target_disease_matches,
-            )
+
+
+####################################################################################################
+# date `days` after (or before, if negative) index_date
+# written out with the sign so that cohortextractor accepts it, as it doesn't parse eg "trial_date + -28 days"
+def date_shift(index_date, days):
+    sign = "-" if days < 0 else "+"
+    return f"{index_date} {sign} {abs(days)} days"
+
+
+####################################################################################################
+# variables read from a csv of patient_id and values, written by an earlier action
+# each keyword gives a column of the file and its type, eg trial_date="date", match_id="int".
+# the file is written with just these columns, sorted by patient_id, so that it's quick to load for each variable
+def values_from_file_X(f_path, **returning_types):
+    variables = dict()
+    for name, returning_type in returning_types.items():
+        date_format = {"date_format": "YYYY-MM-DD"} if returning_type == "date" else {}
+        variables[name] = patients.with_value_from_file(
+            f_path=f_path,
+            returning=name,
+            returning_type=returning_type,
+            **date_format,
         )
     return variables
 
 
 ####################################################################################################
-# number of covid tests in n intervals of a given length, first interval starts on index_date + shift days
+# a query of the SGSS covid test results domain, with the pathogen and formats shared by every test variable.
+# the test period and match order (on_or_after / on_or_before / between, find_first / find_last_match_in_period)
+# are passed through as keyword arguments
+def sgss_query(
+    returning,
+    test_result="any",
+    restrict_to_earliest_specimen_date=False,
+    **kwargs,
+):
+    return patients.with_test_result_in_sgss(
+        pathogen="SARS-CoV-2",
+        test_result=test_result,
+        returning=returning,
+        date_format="YYYY-MM-DD",
+        restrict_to_earliest_specimen_date=restrict_to_earliest_specimen_date,
+        **kwargs,
+    )
+
+
+####################################################################################################
+# number of covid tests in each interval (cuts[i], cuts[i+1]] days after index_date
 def covidtest_n_X(name, index_date, cuts, test_result):
     # covid test date (result can be "any", "positive", or "negative")
-    def var_signature(name, i):
-        # the following lines are added to avoid the following error:
-        # ValueError: Date not in YYYY-MM-DD format: trial_date + -28 days
-        # 0 must be included in cuts
-        if 0 in cuts:
-            if cuts[i] < 0:
-                between = [
-                    f"{index_date} - {abs(cuts[i]) - 1} days",
-                    f"{index_date} - {abs(cuts[i+1])} days",
-                ]
-            else:
-                between = [
-                    f"{index_date} + {cuts[i] + 1} days",
-                    f"{index_date} + {cuts[i+1]} days",
-                ]
+    # each interval's bounds are read off the sorted cuts,
+    # so cuts can be any length, and don't need to include 0
+    cuts = sorted(int(cut) for cut in cuts)
 
+    def var_signature(i):
         return {
-            # f"{name}({cuts[i]},{cuts[i+1]}]_n": patients.with_test_result_in_sgss(
-            f"{name}_{i}_n": patients.with_test_result_in_sgss(
-                pathogen="SARS-CoV-2",
-                test_result=test_result,
-                between=between,
+            # f"{name}({cuts[i]},{cuts[i+1]}]_n": sgss_query(
+            f"{name}_{i}_n": sgss_query(
+                "number_of_matches_in_period",
+                test_result,
+                between=[
+                    date_shift(index_date, cuts[i] + 1),
+                    date_shift(index_date, cuts[i + 1]),
+                ],
                 find_first_match_in_period=True,
-                restrict_to_earliest_specimen_date=False,
-                returning="number_of_matches_in_period",
-                date_format="YYYY-MM-DD",
             ),
         }
 
-    n = len(cuts) - 1
     variables = dict()
-    for i in range(0, n):
-        variables.update(var_signature(name, i))
+    for i in range(len(cuts) - 1):
+        variables.update(var_signature(i))
     return variables
 
 
@@ -93,37 +156,40 @@ def covidtest_returning_X(
     name, index_date, shift, n, test_result, returning, return_expectations=None
 ):
     # covid test date (result can be "any", "positive", or "negative")
-    def var_signature(name, on_or_after):
+    def var_signature(i, on_or_after):
         return {
-            name: patients.with_test_result_in_sgss(
-                pathogen="SARS-CoV-2",
-                test_result=test_result,
+            f"{name}_{i}_{returning}": sgss_query(
+                returning,
+                test_result,
                 on_or_after=on_or_after,
                 find_first_match_in_period=True,
-                restrict_to_earliest_specimen_date=False,
-                returning=returning,
-                date_format="YYYY-MM-DD",
                 return_expectations=return_expectations,
             ),
         }
 
-    # specify sign based on shift
-    if shift < 0:
-        sign = "-"
-    else:
-        sign = "+"
+    # subsequent tests are always chained on the test date, whatever is returned
+    return event_sequence_X(
+        var_signature,
+        on_or_after=date_shift(index_date, shift),
+        n=n,
+        anchor=lambda i: f"{name}_{i}_date",
+    )
+
 
-    variables = var_signature(
-        name=f"{name}_1_{returning}",
-        on_or_after=f"{index_date} {sign} {abs(shift)} days",
+####################################################################################################
+# a query of the ECDS emergency care domain: the first attendance on or after a date,
+# with the diagnosis and discharge filters shared by the emergency attendance functions below
+def emergency_care_query(
+    returning, on_or_after, with_these_diagnoses=None, discharged_to=None
+):
+    return patients.attended_emergency_care(
+        returning=returning,
+        on_or_after=on_or_after,
+        find_first_match_in_period=True,
+        date_format="YYYY-MM-DD",
+        with_these_diagnoses=with_these_diagnoses,
+        discharged_to=discharged_to,
     )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                name=f"{name}_{i}_{returning}", on_or_after=f"{name}_{i-1}_date + 1 day"
-            )
-        )
-    return variables
 
 
 ####################################################################################################
@@ -131,31 +197,41 @@ def emergency_attendance_date_X(
     name, index_date, n, with_these_diagnoses=None, discharged_to=None
 ):
     # emeregency attendance dates
-    def var_signature(name, on_or_after, with_these_diagnoses, discharged_to):
+    def var_signature(i, on_or_after):
         return {
-            name: patients.attended_emergency_care(
-                returning="date_arrived",
-                on_or_after=on_or_after,
-                find_first_match_in_period=True,
-                date_format="YYYY-MM-DD",
-                with_these_diagnoses=with_these_diagnoses,
-                discharged_to=discharged_to,
+            f"{name}_{i}_date": emergency_care_query(
+                "date_arrived", on_or_after, with_these_diagnoses, discharged_to
             ),
         }
 
-    variables = var_signature(
-        f"{name}_1_date", index_date, with_these_diagnoses, discharged_to
+    return event_sequence_X(
+        var_signature,
+        on_or_after=index_date,
+        n=n,
+        anchor=lambda i: f"{name}_{i}_date",
+    )
+
+
+####################################################################################################
+# a query of the SUS admissions domain, with the filters shared by the admitted_* functions below
+def admission_query(
+    returning,
+    on_or_after,
+    with_these_diagnoses=None,
+    with_admission_method=None,
+    with_patient_classification=None,
+    **kwargs,
+):
+    return patients.admitted_to_hospital(
+        returning=returning,
+        on_or_after=on_or_after,
+        find_first_match_in_period=True,
+        date_format="YYYY-MM-DD",
+        with_these_diagnoses=with_these_diagnoses,
+        with_admission_method=with_admission_method,
+        with_patient_classification=with_patient_classification,
+        **kwargs,
     )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                f"{name}_{i}_date",
-                f"{name}_{i-1}_date + 1 day",
-                with_these_diagnoses,
-                discharged_to,
-            )
-        )
-    return variables
 
 
 ####################################################################################################
@@ -171,69 +247,42 @@ def admitted_date_X(
     with_admission_method=None,
     with_patient_classification=None,
 ):
-    def var_signature(
-        name,
-        on_or_after,
-        returning,
-        with_these_diagnoses,
-        with_admission_method,
-        with_patient_classification,
-    ):
+    def var_signature(name, on_or_after, returning):
         return {
-            name: patients.admitted_to_hospital(
-                returning=returning,
-                on_or_after=on_or_after,
-                find_first_match_in_period=True,
-                date_format="YYYY-MM-DD",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
+            name: admission_query(
+                returning,
+                on_or_after,
+                with_these_diagnoses,
+                with_admission_method,
+                with_patient_classification,
             ),
         }
 
-    variables = var_signature(
-        name=f"admitted_{name}_1_date",
-        on_or_after=index_date,
-        returning="date_admitted",
-        with_these_diagnoses=with_these_diagnoses,
-        with_admission_method=with_admission_method,
-        with_patient_classification=with_patient_classification,
-    )
-    variables.update(
-        var_signature(
-            name=f"discharged_{name}_1_date",
-            on_or_after=index_date,
-            returning="date_discharged",
-            with_these_diagnoses=with_these_diagnoses,
-            with_admission_method=with_admission_method,
-            with_patient_classification=with_patient_classification,
-        )
-    )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                name=f"admitted_{name}_{i}_date",
-                on_or_after=f"discharged_{name}_{i-1}_date + 1 day",
-                # we cannot pick up more than one admission per day
-                # but "+ 1 day" is necessary to ensure we don't always pick up the same admission
-                # some one day admissions will therefore be lost
-                returning="date_admitted",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
-            )
+    def episode_signature(i, on_or_after):
+        variables = var_signature(
+            name=f"admitted_{name}_{i}_date",
+            on_or_after=on_or_after,
+            returning="date_admitted",
         )
         variables.update(
             var_signature(
                 name=f"discharged_{name}_{i}_date",
-                on_or_after=f"admitted_{name}_{i}_date",
+                # the first discharge date is looked up from the index date
+                on_or_after=index_date if i == 1 else f"admitted_{name}_{i}_date",
                 returning="date_discharged",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
             )
         )
-    return variables
+        return variables
+
+    # we cannot pick up more than one admission per day
+    # but "+ 1 day" is necessary to ensure we don't always pick up the same admission
+    # some one day admissions will therefore be lost
+    return event_sequence_X(
+        episode_signature,
+        on_or_after=index_date,
+        n=n,
+        anchor=lambda i: f"discharged_{name}_{i}_date",
+    )
 
 
 ####################################################################################################
@@ -255,14 +304,12 @@ def admitted_daysincritcare_X(
         with_patient_classification,
     ):
         return {
-            name: patients.admitted_to_hospital(
-                returning="days_in_critical_care",
-                on_or_after=on_or_after,
-                find_first_match_in_period=True,
-                date_format="YYYY-MM-DD",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
+            name: admission_query(
+                "days_in_critical_care",
+                on_or_after,
+                with_these_diagnoses,
+                with_admission_method,
+                with_patient_classification,
                 return_expectations={
                     "category": {"ratios": {"0": 0.75, "1": 0.20, "2": 0.05}},
                     "incidence": 0.5,
@@ -302,69 +349,41 @@ def critcare_date_length_X(
     with_admission_method=None,
     with_patient_classification=None,
 ):
-    def var_signature(
-        name,
-        on_or_after,
-        returning,
-        with_these_diagnoses,
-        with_admission_method,
-        with_patient_classification,
-    ):
+    def var_signature(name, on_or_after, returning):
         return {
-            name: patients.admitted_to_hospital(
-                returning=returning,
-                on_or_after=on_or_after,
-                find_first_match_in_period=True,
-                date_format="YYYY-MM-DD",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
+            name: admission_query(
+                returning,
+                on_or_after,
+                with_these_diagnoses,
+                with_admission_method,
+                with_patient_classification,
             ),
         }
 
-    variables = var_signature(
-        name=f"admitted_{name}_1_date",
-        on_or_after=index_date,
-        returning="date_admitted",
-        with_these_diagnoses=with_these_diagnoses,
-        with_admission_method=with_admission_method,
-        with_patient_classification=with_patient_classification,
-    )
-    variables.update(
-        var_signature(
-            name=f"length_{name}_1_date",
-            on_or_after=f"admitted_{name}_1_date",
-            returning="days_in_critical_care",
-            with_these_diagnoses=with_these_diagnoses,
-            with_admission_method=with_admission_method,
-            with_patient_classification=with_patient_classification,
-        )
-    )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                name=f"admitted_{name}_{i}_date",
-                on_or_after=f"admitted_{name}_{i-1}_date + 1 day",
-                # we cannot pick up more than one admission per day
-                # but "+ 1 day" is necessary to ensure we don't always pick up the same admission
-                # some one day admissions will therefore be lost
-                returning="date_admitted",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
-            )
+    def episode_signature(i, on_or_after):
+        variables = var_signature(
+            name=f"admitted_{name}_{i}_date",
+            on_or_after=on_or_after,
+            returning="date_admitted",
         )
         variables.update(
             var_signature(
                 name=f"length_{name}_{i}_date",
                 on_or_after=f"admitted_{name}_{i}_date",
                 returning="days_in_critical_care",
-                with_these_diagnoses=with_these_diagnoses,
-                with_admission_method=with_admission_method,
-                with_patient_classification=with_patient_classification,
             )
         )
-    return variables
+        return variables
+
+    # we cannot pick up more than one admission per day
+    # but "+ 1 day" is necessary to ensure we don't always pick up the same admission
+    # some one day admissions will therefore be lost
+    return event_sequence_X(
+        episode_signature,
+        on_or_after=index_date,
+        n=n,
+        anchor=lambda i: f"admitted_{name}_{i}_date",
+    )
 
 
 # admitted_to_hospital_X: Creates n columns for each consecutive event of hospital admission/discharge dates, admission method
@@ -383,20 +402,6 @@ def admitted_to_hospital_X(n, with_admission_method, on_or_after, end_date):
             ),
         }
 
-    def var_signature2(
-        name, returning, on_or_after, with_admission_method, return_expectations
-    ):
-        return {
-            name: patients.admitted_to_hospital(
-                returning=returning,
-                on_or_after=on_or_after,
-                date_format="YYYY-MM-DD",
-                find_first_match_in_period=True,
-                with_admission_method=with_admission_method,
-                return_expectations=return_expectations,
-            ),
-        }
-
     # Expections for admission dates
     return_expectations_date_adm = {
         "date": {"earliest": "2020-01-01", "latest": end_date},
@@ -439,12 +444,7 @@ def admitted_to_hospital_X(n, with_admission_method, on_or_after, end_date):
     }
 
     # Expectation for primary diagnosis
-    return_expectations_diagnosis = {
-        "category": {"ratios": {"J45": 0.25, "E10": 0.25, "C91": 0.25, "I50": 0.25}},
-        "incidence": 0.95,
-    }
-
-    # Expectation for admission treatment function code
+    # (these are admission treatment function codes, which is what has always been used for the dummy data)
     return_expectations_diagnosis = {
         "category": {"ratios": {"100": 0.25, "173": 0.25, "212": 0.25, "I50": 0.25}},
         "incidence": 0.95,
@@ -456,119 +456,124 @@ def admitted_to_hospital_X(n, with_admission_method, on_or_after, end_date):
         "incidence": 0.5,
     }
 
-    for i in range(1, n + 1):
-        if i == 1:
-            variables = var_signature(
-                "admission_date_1",
-                "date_admitted",
-                on_or_after,
-                with_admission_method,
-                return_expectations_date_adm,
-            )
-            variables.update(
-                var_signature2(
-                    "discharge_date_1",
-                    "date_discharged",
-                    "admission_date_1",
-                    with_admission_method,
-                    return_expectations_date_dis,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    "admission_method_1",
-                    "admission_method",
-                    "admission_date_1",
-                    with_admission_method,
-                    return_expectations_method,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    "primary_diagnosis_1",
-                    "primary_diagnosis",
-                    "admission_date_1",
-                    with_admission_method,
-                    return_expectations_diagnosis,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    "critical_care_days_1",
-                    "days_in_critical_care",
-                    "admission_date_1",
-                    with_admission_method,
-                    return_expectations_critical_care,
-                )
-            )
-        else:
+    def episode_signature(i, on_or_after):
+        variables = var_signature(
+            f"admission_date_{i}",
+            "date_admitted",
+            on_or_after,
+            with_admission_method,
+            return_expectations_date_adm,
+        )
+        # all other episode variables are taken from the admission on the admission date
+        for name, returning, return_expectations in [
+            ("discharge_date", "date_discharged", return_expectations_date_dis),
+            ("admission_method", "admission_method", return_expectations_method),
+            ("primary_diagnosis", "primary_diagnosis", return_expectations_diagnosis),
+            (
+                "critical_care_days",
+                "days_in_critical_care",
+                return_expectations_critical_care,
+            ),
+        ]:
             variables.update(
                 var_signature(
-                    f"admission_date_{i}",
-                    "date_admitted",
-                    f"admission_date_{i-1} + 1 day",
-                    with_admission_method,
-                    return_expectations_date_adm,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    f"discharge_date_{i}",
-                    "date_discharged",
-                    f"admission_date_{i}",
-                    with_admission_method,
-                    return_expectations_date_dis,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    f"admission_method_{i}",
-                    "admission_method",
+                    f"{name}_{i}",
+                    returning,
                     f"admission_date_{i}",
                     with_admission_method,
-                    return_expectations_method,
+                    return_expectations,
                 )
             )
-            variables.update(
-                var_signature2(
-                    f"primary_diagnosis_{i}",
-                    "primary_diagnosis",
-                    f"admission_date_{i}",
-                    with_admission_method,
-                    return_expectations_diagnosis,
-                )
-            )
-            variables.update(
-                var_signature2(
-                    f"critical_care_days_{i}",
-                    "days_in_critical_care",
-                    f"admission_date_{i}",
-                    with_admission_method,
-                    return_expectations_critical_care,
-                )
-            )
-    return variables
+        return variables
+
+    return event_sequence_X(
+        episode_signature,
+        on_or_after=on_or_after,
+        n=n,
+        anchor=lambda i: f"admission_date_{i}",
+    )
 
 
 def carditis_emergency_X(carditis_type, on_or_after):
-    def var_signature(name, on_or_after, with_these_diagnoses):
-        return {
-            name: patients.attended_emergency_care(
-                returning="binary_flag",
-                date_format="YYYY-MM-DD",
-                on_or_after=on_or_after,
-                with_these_diagnoses=with_these_diagnoses,  # 3238004 Pericarditis; 373945007	Pericardial effusion
-                find_first_match_in_period=True,
-            ),
-        }
+    # the same diagnosis codelists as the pericarditis and myocarditis emergency attendance outcomes
+    with_these_diagnoses = getattr(codelists, f"{carditis_type}carditis_snomedECDS")
+    return {
+        f"{carditis_type}carditis_emergency": emergency_care_query(
+            "binary_flag", on_or_after, with_these_diagnoses
+        ),
+    }
 
-    if carditis_type == "myo":
-        with_these_diagnoses = ["50920009"]
-    if carditis_type == "peri":
-        with_these_diagnoses = ["3238004", "373945007"]
-    variables = var_signature(
-        name=f"{carditis_type}carditis_emergency",
-        on_or_after=on_or_after,
-        with_these_diagnoses=with_these_diagnoses,
+
+####################################################################################################
+# repeated queries across the generators merged into a study definition are only run once
+# two variables repeat each other if they call the same `patients.*` function with the same arguments,
+# ignoring return_expectations. the first is kept, and later repeats become aliases of it:
+# binary flags are `satisfying` the first, and dates and counts are `minimum_of` the first.
+# `minimum_of` doesn't take return_expectations: cohort-extractor, and analysis/dummy/dummydata.py,
+# give it the type and dummy values of its source column, so an alias has the same type as the variable it repeats.
+# other return types, and variables that are already derived from other variables, are left as they are
+derived_queries = ("fixed_value", "satisfying", "categorised_as", "aggregate_of")
+
+
+def alias_query(returning, name):
+    if returning == "binary_flag":
+        return patients.satisfying(name)
+    if returning.startswith("date") or returning.startswith("number_of"):
+        return patients.minimum_of(name)
+    return None
+
+
+def deduplicate_variables(study_definition, variables):
+    def query_key(funcname, kwargs):
+        # codelists are compared by their coding system and codes
+        arguments = sorted(
+            (argument, (getattr(value, "system", None), list(value)))
+            if isinstance(value, list)
+            else (argument, value)
+            for argument, value in kwargs.items()
+            if argument != "return_expectations"
+        )
+        return repr((funcname, arguments))
+
+    deduplicated = dict()
+    first = dict()
+    aliases = []
+    for name, query in variables.items():
+        funcname, kwargs = query
+        if funcname not in derived_queries and isinstance(kwargs.get("returning"), str):
+            key = query_key(funcname, kwargs)
+            alias = alias_query(kwargs["returning"], first[key]) if key in first else None
+            if alias is not None:
+                aliases.append(f"{name} = {first[key]}")
+                query = alias
+            first.setdefault(key, name)
+        deduplicated[name] = query
+
+    print(
+        f"{study_definition}: {len(aliases)} repeated queries aliased"
+        + "".join(f"\n  {alias}" for alias in aliases)
     )
-    return variables
+    return deduplicated
+
+
+####################################################################################################
+# the number of database queries a study definition's variables make, for each domain
+# (admissions, emergency care, test results, ...), so that the cost of each domain can be seen in the action log.
+# variables derived from other variables, and those nested in them, are counted too.
+# every study definition prints its counts with `print_query_counts`, after it's defined
+def query_counts(variables, counts=None):
+    counts = dict() if counts is None else counts
+    for query in variables.values():
+        funcname, kwargs = query
+        if funcname not in derived_queries:
+            counts[funcname] = counts.get(funcname, 0) + 1
+        # nested variables are collected by `**extra_columns`
+        query_counts(kwargs.get("extra_columns") or {}, counts)
+    return counts
+
+
+def print_query_counts(study_definition, variables):
+    counts = query_counts(variables)
+    print(f"{study_definition}: {sum(counts.values())} database queries")
+    for funcname, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {funcname}: {count}")
@@ -1,5 +1,4 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import json
 import codelists
 
@@ -30,7 +29,7 @@ def generate_inclusion_variables(baseline_date):
         PREG1_GROUP
         """,
             HHLD_IMDEF=patients.with_these_clinical_events(
-                hhld_imdef_cod,
+                codelists.hhld_imdef_cod,
                 on_or_before=f"{baseline_date} - 1 day",
             ),
             nulldate=patients.fixed_value("1902-01-01"),
@@ -67,19 +66,19 @@ def generate_inclusion_variables(baseline_date):
                 """,
                     ###  any immunosuppressant Read code is recorded
                     IMMDX=patients.with_these_clinical_events(
-                        immdx_cov_cod,
+                        codelists.immdx_cov_cod,
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
                     ),
                     ### any Immunosuppression medication codes is recorded
                     IMMRX=patients.with_these_clinical_events(
-                        immrx_cod,
+                        codelists.immrx_cod,
                         find_last_match_in_period=True,
                         between=[specific_atrisk_date, f"{baseline_date} - 1 day"],
                     ),
                     ### Receiving chemotherapy or radiotherapy
                     DXT_CHEMO=patients.with_these_clinical_events(
-                        dxt_chemo_cod,
+                        codelists.dxt_chemo_cod,
                         find_last_match_in_period=True,
                         between=[
                             f"{baseline_date} - 6 months",
@@ -113,19 +112,19 @@ def generate_inclusion_variables(baseline_date):
                 """,
                     ### Chronic kidney disease diagnostic codes
                     CKD_COV=patients.with_these_clinical_events(
-                        ckd_cov_cod,
+                        codelists.ckd_cov_cod,
                         find_first_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
                     ),
                     ### Chronic kidney disease codes - all stages
                     CKD15=patients.with_these_clinical_events(
-                        ckd15_cod,
+                        codelists.ckd15_cod,
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
                     ),
                     ### date of Chronic kidney disease codes-stages 3 – 5
                     CKD35_DAT=patients.with_these_clinical_events(
-                        ckd35_cod,
+                        codelists.ckd35_cod,
                         returning="date",
                         find_last_match_in_period=True,
                         date_format="YYYY-MM-DD",
@@ -133,7 +132,7 @@ def generate_inclusion_variables(baseline_date):
                     ),
                     ### date of Chronic kidney disease codes - all stages
                     CKD15_DAT=patients.with_these_clinical_events(
-                        ckd15_cod,
+                        codelists.ckd15_cod,
                         returning="date",
                         date_format="YYYY-MM-DD",
                         on_or_before=f"{baseline_date} - 1 day",
@@ -162,7 +161,7 @@ def generate_inclusion_variables(baseline_date):
                 """,
                         ### Asthma Admission codes
                         ASTADM=patients.with_these_clinical_events(
-                            astadm_cod,
+                            codelists.astadm_cod,
                             find_last_match_in_period=True,
                             between=[
                                 f"{baseline_date} - 730 days",
@@ -171,13 +170,13 @@ def generate_inclusion_variables(baseline_date):
                         ),
                         ### Asthma Diagnosis code
                         AST=patients.with_these_clinical_events(
-                            ast_cod,
+                            codelists.ast_cod,
                             find_first_match_in_period=True,
                             on_or_before=f"{baseline_date} - 1 day",
                         ),
                         ### Asthma - inhalers in last 12 months
                         ASTRXM1=patients.with_these_medications(
-                            astrxm1_cod,
+                            codelists.astrxm1_cod,
                             returning="binary_flag",
                             between=[
                                 f"{baseline_date} - 365 days",
@@ -186,7 +185,7 @@ def generate_inclusion_variables(baseline_date):
                         ),
                         ### Asthma - systemic oral steroid prescription codes in last 24 months
                         ASTRXM2=patients.with_these_medications(
-                            astrxm2_cod,
+                            codelists.astrxm2_cod,
                             returning="number_of_matches_in_period",
                             between=[
                                 f"{baseline_date} - 730 days",
@@ -196,7 +195,7 @@ def generate_inclusion_variables(baseline_date):
                     ),
                     ### Chronic Respiratory Disease
                     RESP_COV=patients.with_these_clinical_events(
-                        resp_cov_cod,
+                        codelists.resp_cov_cod,
                         find_first_match_in_period=True,
                         returning="binary_flag",
                         on_or_before=f"{baseline_date} - 1 day",
@@ -219,7 +218,7 @@ def generate_inclusion_variables(baseline_date):
                 """,
                     ### Date any Diabetes diagnosis Read code is recorded
                     DIAB_DAT=patients.with_these_clinical_events(
-                        diab_cod,
+                        codelists.diab_cod,
                         returning="date",
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
@@ -227,7 +226,7 @@ def generate_inclusion_variables(baseline_date):
                     ),
                     ### Date of Diabetes resolved codes
                     DMRES_DAT=patients.with_these_clinical_events(
-                        dmres_cod,
+                        codelists.dmres_cod,
                         returning="date",
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
@@ -235,7 +234,7 @@ def generate_inclusion_variables(baseline_date):
                     ),
                     ### Addison’s disease & Pan-hypopituitary diagnosis codes
                     ADDIS=patients.with_these_clinical_events(
-                        addis_cod,
+                        codelists.addis_cod,
                         find_last_match_in_period=True,
                         returning="binary_flag",
                         on_or_before=f"{baseline_date} - 1 day",
@@ -249,7 +248,7 @@ def generate_inclusion_variables(baseline_date):
                 """,
                         ### Gestational Diabetes diagnosis codes
                         GDIAB=patients.with_these_clinical_events(
-                            gdiab_cod,
+                            codelists.gdiab_cod,
                             find_last_match_in_period=True,
                             returning="binary_flag",
                             between=[
@@ -268,7 +267,7 @@ def generate_inclusion_variables(baseline_date):
                     """,
                             ### Pregnancy codes recorded in the 8.5 months before the audit run date
                             PREG=patients.with_these_clinical_events(
-                                preg_cod,
+                                codelists.preg_cod,
                                 returning="binary_flag",
                                 between=[
                                     f"{baseline_date} - 254 days",
@@ -277,7 +276,7 @@ def generate_inclusion_variables(baseline_date):
                             ),
                             ### Pregnancy or Delivery codes recorded in the 8.5 months before audit run date
                             PREGDEL_DAT=patients.with_these_clinical_events(
-                                pregdel_cod,
+                                codelists.pregdel_cod,
                                 returning="date",
                                 find_last_match_in_period=True,
                                 between=[
@@ -288,7 +287,7 @@ def generate_inclusion_variables(baseline_date):
                             ),
                             ### Date of pregnancy codes recorded in the 8.5 months before audit run date
                             PREG_DAT=patients.with_these_clinical_events(
-                                preg_cod,
+                                codelists.preg_cod,
                                 returning="date",
                                 find_last_match_in_period=True,
                                 between=[
@@ -302,35 +301,35 @@ def generate_inclusion_variables(baseline_date):
                 ),
                 ### Chronic Liver disease codes
                 CLD=patients.with_these_clinical_events(
-                    cld_cod,
+                    codelists.cld_cod,
                     find_first_match_in_period=True,
                     returning="binary_flag",
                     on_or_before=f"{baseline_date} - 1 day",
                 ),
                 ### Patients with CNS Disease (including Stroke/TIA)
                 CNS_GROUP=patients.with_these_clinical_events(
-                    cns_cov_cod,
+                    codelists.cns_cov_cod,
                     find_first_match_in_period=True,
                     returning="binary_flag",
                     on_or_before=f"{baseline_date} - 1 day",
                 ),
                 ### Chronic heart disease codes
                 CHD_COV=patients.with_these_clinical_events(
-                    chd_cov_cod,
+                    codelists.chd_cov_cod,
                     find_first_match_in_period=True,
                     returning="binary_flag",
                     on_or_before=f"{baseline_date} - 1 day",
                 ),
                 ### Asplenia or Dysfunction of the Spleen codes
                 SPLN_COV=patients.with_these_clinical_events(
-                    spln_cov_cod,
+                    codelists.spln_cov_cod,
                     find_first_match_in_period=True,
                     returning="binary_flag",
                     on_or_before=f"{baseline_date} - 1 day",
                 ),
                 ### Wider Learning Disability
                 LEARNDIS=patients.with_these_clinical_events(
-                    learndis_cod,
+                    codelists.learndis_cod,
                     find_last_match_in_period=True,
                     returning="binary_flag",
                     on_or_before=f"{baseline_date} - 1 day",
@@ -346,7 +345,7 @@ def generate_inclusion_variables(baseline_date):
             """,
                     ### date of Severe Mental Illness codes
                     SEV_MENTAL_DAT=patients.with_these_clinical_events(
-                        sev_mental_cod,
+                        codelists.sev_mental_cod,
                         returning="date",
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
@@ -354,7 +353,7 @@ def generate_inclusion_variables(baseline_date):
                     ),
                     ### date of Remission codes relating to Severe Mental Illness
                     SMHRES_DAT=patients.with_these_clinical_events(
-                        smhres_cod,
+                        codelists.smhres_cod,
                         returning="date",
                         find_last_match_in_period=True,
                         on_or_before=f"{baseline_date} - 1 day",
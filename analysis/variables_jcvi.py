@@ -1,7 +1,8 @@
 from cohortextractor import patients
-from codelists import *
 import codelists
 
+from variables_functions import sgss_query
+
 
 def generate_jcvi_variables(baseline_date):
     jcvi_variables = dict(
@@ -49,16 +50,13 @@ def generate_jcvi_variables(baseline_date):
                 between=["housebound_date", f"{baseline_date} - 1 day"],
             ),
         ),
-        prior_covid_test_frequency=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="any",
+        prior_covid_test_frequency=sgss_query(
+            "number_of_matches_in_period",
+            "any",
             between=[
                 f"{baseline_date} - 182 days",
                 f"{baseline_date} - 1 day",
             ],  # 182 days = 26 weeks
-            returning="number_of_matches_in_period",
-            date_format="YYYY-MM-DD",
-            restrict_to_earliest_specimen_date=False,
         ),
         # # overnight hospital admission at time of 3rd / booster dose
         # inhospital = patients.satisfying(
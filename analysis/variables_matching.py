@@ -1,8 +1,9 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import json
 import codelists
 
+from variables_functions import emergency_admission_method, sgss_query
+
 ############################################################
 ## childhood vax variables
 from variables_childhood_vaccs import childhood_vaccs
@@ -171,25 +172,19 @@ def generate_matching_variables(baseline_date):
         #   restrict_to_earliest_specimen_date=False,
         # ),
         # positive covid test
-        postest_0_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="positive",
-            returning="date",
-            date_format="YYYY-MM-DD",
+        postest_0_date=sgss_query(
+            "date",
+            "positive",
             on_or_before=f"{baseline_date} - 1 day",
             find_last_match_in_period=True,
-            restrict_to_earliest_specimen_date=False,
         ),
-        prior_covid_test_frequency=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="any",
+        prior_covid_test_frequency=sgss_query(
+            "number_of_matches_in_period",
+            "any",
             between=[
                 f"{baseline_date} - 182 days",
                 f"{baseline_date} - 1 day",
             ],  # 182 days = 26 weeks
-            returning="number_of_matches_in_period",
-            date_format="YYYY-MM-DD",
-            restrict_to_earliest_specimen_date=False,
         ),
         # emergency attendance for covid
         covidemergency_0_date=patients.attended_emergency_care(
@@ -202,18 +197,7 @@ def generate_matching_variables(baseline_date):
         # Positive covid admission prior to study start date
         covidadmitted_0_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelists.covid_icd10,
             on_or_before=f"{baseline_date} - 1 day",
             date_format="YYYY-MM-DD",
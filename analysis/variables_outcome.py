@@ -1,42 +1,11 @@
-from cohortextractor import patients, combine_codelists
-from codelists import *
+from cohortextractor import patients, combine_codelists, codelist
 import codelists
 
-
-def vaccination_date_X(
-    name,
-    on_or_after,
-    n,
-    delay=1,
-    product_name_matches=None,
-    target_disease_matches=None,
-):
-    # vaccination date, given product_name
-    def var_signature(name, on_or_after, product_name_matches, target_disease_matches):
-        return {
-            name: patients.with_tpp_vaccination_record(
-                product_name_matches=product_name_matches,
-                target_disease_matches=target_disease_matches,
-                on_or_after=on_or_after,
-                find_first_match_in_period=True,
-                returning="date",
-                date_format="YYYY-MM-DD",
-            ),
-        }
-
-    variables = var_signature(
-        f"{name}_1_date", on_or_after, product_name_matches, target_disease_matches
-    )
-    for i in range(2, n + 1):
-        variables.update(
-            var_signature(
-                f"{name}_{i}_date",
-                f"{name}_{i-1}_date + {delay} days",
-                product_name_matches,
-                target_disease_matches,
-            )
-        )
-    return variables
+from variables_functions import (
+    vaccination_date_X,
+    emergency_admission_method,
+    sgss_query,
+)
 
 
 def generate_outcome_variables(baseline_date, product_name):
@@ -59,24 +28,18 @@ def generate_outcome_variables(baseline_date, product_name):
             find_first_match_in_period=True,
         ),
         # covid PCR test dates from SGSS
-        covid_test_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="any",
+        covid_test_date=sgss_query(
+            "date",
+            "any",
             on_or_after=baseline_date,
             find_first_match_in_period=True,
-            restrict_to_earliest_specimen_date=False,
-            returning="date",
-            date_format="YYYY-MM-DD",
         ),
         # positive covid test
-        postest_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="positive",
-            returning="date",
-            date_format="YYYY-MM-DD",
+        postest_date=sgss_query(
+            "date",
+            "positive",
             on_or_after=baseline_date,
             find_first_match_in_period=True,
-            restrict_to_earliest_specimen_date=False,
         ),
         # emergency attendance for covid, as per discharge diagnosis
         covidemergency_date=patients.attended_emergency_care(
@@ -100,27 +63,13 @@ def generate_outcome_variables(baseline_date, product_name):
             returning="date_arrived",
             date_format="YYYY-MM-DD",
             on_or_after=baseline_date,
-            with_these_diagnoses=[
-                "3238004",
-                "373945007",
-            ],  # 3238004 Pericarditis; 373945007	Pericardial effusion
+            with_these_diagnoses=codelists.pericarditis_snomedECDS,
             find_first_match_in_period=True,
         ),
         # admitted for pericarditis
         pericarditisadmitted_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelist(["I30"], system="icd10"),
             on_or_after=baseline_date,
             date_format="YYYY-MM-DD",
@@ -131,24 +80,13 @@ def generate_outcome_variables(baseline_date, product_name):
             returning="date_arrived",
             date_format="YYYY-MM-DD",
             on_or_after=baseline_date,
-            with_these_diagnoses=["50920009"],  # 50920009	Myocarditis
+            with_these_diagnoses=codelists.myocarditis_snomedECDS,
             find_first_match_in_period=True,
         ),
         # admitted for myocarditis
         myocarditisadmitted_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelist(["I514", "I41", "I40"], system="icd10"),
             on_or_after=baseline_date,
             date_format="YYYY-MM-DD",
@@ -194,18 +132,7 @@ def generate_outcome_variables(baseline_date, product_name):
             on_or_after=baseline_date,
             # see https://github.com/opensafely-core/cohort-extractor/pull/497 for codes
             # see https://docs.opensafely.org/study-def-variables/#sus for more info
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_patient_classification=["1"],  # ordinary admissions only
             date_format="YYYY-MM-DD",
             find_first_match_in_period=True,
@@ -224,18 +151,7 @@ def generate_outcome_variables(baseline_date, product_name):
         # Positive covid admission prior to study start date
         covidadmitted_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelists.covid_icd10,
             on_or_after=baseline_date,
             date_format="YYYY-MM-DD",
@@ -243,18 +159,7 @@ def generate_outcome_variables(baseline_date, product_name):
         ),
         covidcritcare_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelists.covid_icd10,
             with_at_least_one_day_in_critical_care=True,
             on_or_after=baseline_date,
@@ -274,19 +179,15 @@ def generate_outcome_variables(baseline_date, product_name):
         ),
         # censor_date = patients.minimum_of("death_date", "dereg_date", f"{baseline_date} + 140 days"), # 140 is the maximum days of follow up, specified in design.R
         # once the above censor_date variable is possible, then replace `f"{baseline_date} + 140 days"` with `censor_date` below
-        test_count=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="any",
-            returning="number_of_matches_in_period",
+        test_count=sgss_query(
+            "number_of_matches_in_period",
+            "any",
             between=[baseline_date, f"{baseline_date} + 140 days"],
-            restrict_to_earliest_specimen_date=False,
         ),
-        postest_count=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="positive",
-            returning="number_of_matches_in_period",
+        postest_count=sgss_query(
+            "number_of_matches_in_period",
+            "positive",
             between=[baseline_date, f"{baseline_date} + 140 days"],
-            restrict_to_earliest_specimen_date=False,
         ),
         # fracture outcomes (negative control)
         # a+e attendance due to fractures
@@ -302,18 +203,7 @@ def generate_outcome_variables(baseline_date, product_name):
             returning="date_admitted",
             on_or_after=baseline_date,
             with_these_diagnoses=codelists.fractures_icd10,
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             date_format="YYYY-MM-DD",
             find_first_match_in_period=True,
         ),
@@ -1,7 +1,8 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import codelists
 
+from variables_functions import emergency_admission_method, sgss_query
+
 
 def generate_prebase_variables(baseline_date):
     prebase_variables = dict(
@@ -21,24 +22,18 @@ def generate_prebase_variables(baseline_date):
             find_last_match_in_period=True,
         ),
         # covid PCR test dates from SGSS
-        covid_test_0_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="any",
+        covid_test_0_date=sgss_query(
+            "date",
+            "any",
             on_or_before=f"{baseline_date} - 1 day",
-            returning="date",
-            date_format="YYYY-MM-DD",
             find_last_match_in_period=True,
-            restrict_to_earliest_specimen_date=False,
         ),
         # positive covid test
-        postest_0_date=patients.with_test_result_in_sgss(
-            pathogen="SARS-CoV-2",
-            test_result="positive",
-            returning="date",
-            date_format="YYYY-MM-DD",
+        postest_0_date=sgss_query(
+            "date",
+            "positive",
             on_or_before=f"{baseline_date} - 1 day",
             find_last_match_in_period=True,
-            restrict_to_earliest_specimen_date=False,
         ),
         # emergency attendance for covid
         covidemergency_0_date=patients.attended_emergency_care(
@@ -51,18 +46,7 @@ def generate_prebase_variables(baseline_date):
         # Positive covid admission prior to study start date
         covidadmitted_0_date=patients.admitted_to_hospital(
             returning="date_admitted",
-            with_admission_method=[
-                "21",
-                "22",
-                "23",
-                "24",
-                "25",
-                "2A",
-                "2B",
-                "2C",
-                "2D",
-                "28",
-            ],
+            with_admission_method=emergency_admission_method,
             with_these_diagnoses=codelists.covid_icd10,
             on_or_before=f"{baseline_date} - 1 day",
             date_format="YYYY-MM-DD",
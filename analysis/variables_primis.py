@@ -1,5 +1,4 @@
 from cohortextractor import patients, combine_codelists
-from codelists import *
 import json
 import codelists
 
@@ -0,0 +1,451 @@
+# # # # # # # # # # # # # # # # # # # # #
+# This script:
+# runs actions from project.yaml locally, with `opensafely exec`,
+# skipping any action whose inputs haven't changed since it was last run
+#
+# an action's inputs are:
+# - its `run` command
+# - the source files it depends on: the study definition and every local module it imports,
+#   or the R script and every file it `source`s, plus any project files these refer to by path
+#   (lib/design/*.json, codelists/*.csv, lib/dummydata/*.feather, ...)
+# - the output files of the actions it `needs` that it reads: those whose paths match a path in its source,
+#   such as ghere("output", cohort, "vax{vaxn}", "treated", "data_treatedmatching.rds"), or in its arguments.
+#   if it refers to none of a needed action's outputs, all of them are included, as it may build their paths some other way
+# these are hashed into a key, and the action's outputs are stored in .action-cache/ under that key.
+# so, eg, editing variables_outcome.py re-runs extract_treated and extract_controlfinal, and then process_treated.
+# but the matching actions read process_treated's data_treatedmatching.rds, which doesn't include the outcome variables,
+# rather than data_treatedeligible.rds, so they stay cached. only the treated skim, process_controlfinal and the actions after it re-run
+#
+# usage, from the project root:
+# python run-project.py                         # run all actions
+# python run-project.py process_treated_over12_1 # run this action, and anything it needs
+# python run-project.py --force ...             # ignore the cache
+# python run-project.py --jobs 8 --memory 32    # run up to 8 actions at once, within 32GB
+#
+# independent actions run concurrently, and a critical-path report is printed at the end
+# # # # # # # # # # # # # # # # # # # # #
+
+import argparse
+import ast
+import fnmatch
+import glob
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import yaml
+
+cache_dir = ".action-cache"
+
+############################################################
+## project.yaml
+
+
+def read_project(path="project.yaml"):
+    with open(path) as f:
+        project = yaml.safe_load(f)
+    actions = project["actions"]
+    for name, action in actions.items():
+        action["needs"] = action.get("needs") or []
+        action["output_patterns"] = [
+            pattern
+            for outputs in (action.get("outputs") or {}).values()
+            for pattern in outputs.values()
+        ]
+    return project, actions
+
+
+def required_actions(actions, targets):
+    # targets and everything they need, in an order where each action comes after its needs
+    ordered = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for need in actions[name]["needs"]:
+            visit(need)
+        ordered.append(name)
+
+    for target in targets:
+        visit(target)
+    return ordered
+
+
+def action_outputs(action):
+    return sorted(
+        path
+        for pattern in action["output_patterns"]
+        for path in glob.glob(pattern)
+        if os.path.isfile(path)
+    )
+
+
+############################################################
+## source dependencies
+
+
+def file_sha(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def output_pattern(parts):
+    # a glob for the output files a path built from these parts could be, eg
+    # ghere("output", cohort, "vax{vaxn}", "treated", "data_treatedmatching.rds") -> output/*/vax*/treated/data_treatedmatching.rds
+    # where None is a part that isn't known until the action runs
+    path = "/".join("*" if part is None else re.sub(r"\{[^}]*\}", "*", part) for part in parts)
+    return path if path.startswith("output/") else None
+
+
+def python_dependencies(path, found, outputs):
+    # the module, the local modules it imports (recursively), and any files it refers to by path,
+    # and the output files it refers to by path, including f-strings
+    if path in found:
+        return
+    found.add(path)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules = [node.module]
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            referenced = os.path.normpath(node.value)
+            if os.path.isfile(referenced):
+                found.add(referenced)
+            outputs.add(output_pattern([node.value]))
+            modules = []
+        elif isinstance(node, ast.JoinedStr):
+            parts = [
+                value.value if isinstance(value, ast.Constant) else None
+                for value in node.values
+            ]
+            outputs.add(output_pattern(["".join(part or "*" for part in parts)]))
+            modules = []
+        else:
+            modules = []
+        for module in modules:
+            module_path = os.path.join("analysis", module.split(".")[0] + ".py")
+            if os.path.isfile(module_path):
+                python_dependencies(module_path, found, outputs)
+
+
+# here("lib", "functions", "utility.R") and ghere(...) with only literal arguments
+r_path_pattern = re.compile(r"\bg?here\(\s*((?:\"[^\"]*\"\s*,?\s*)+)\)")
+# here(...) and ghere(...) with any arguments, including calls such as glue("matchround", .x)
+r_any_path_pattern = re.compile(r"\bg?here\(((?:[^()]|\([^()]*\))*)\)")
+
+
+def r_path_arguments(arguments):
+    # the literal arguments of a here(...) call, and None for the others
+    parts = re.findall(r"(?:[^,()]|\([^()]*\))+", arguments)
+    return [
+        part.strip()[1:-1] if re.fullmatch(r"\s*\"[^\"]*\"\s*", part) else None
+        for part in parts
+    ]
+
+
+def r_dependencies(path, found, outputs):
+    # the script, the scripts it `source`s (recursively), and any files it refers to by path,
+    # and the output files it refers to by path
+    if path in found:
+        return
+    found.add(path)
+    with open(path) as f:
+        source = f.read()
+    for match in r_path_pattern.finditer(source):
+        referenced = os.path.join(*re.findall(r"\"([^\"]*)\"", match.group(1)))
+        if "{" in referenced:
+            # file names built with glue, eg lib/dummydata/dummy_treated_{cohort}_{vaxn}.feather
+            if referenced.startswith("lib"):
+                found.update(glob.glob(re.sub(r"\{[^}]*\}", "*", referenced)))
+        elif os.path.isfile(referenced):
+            if referenced.endswith(".R"):
+                r_dependencies(referenced, found, outputs)
+            else:
+                found.add(referenced)
+    for match in r_any_path_pattern.finditer(source):
+        outputs.add(output_pattern(r_path_arguments(match.group(1))))
+
+
+def source_dependencies(action):
+    # the source files the action depends on, and globs for the output files it refers to
+    command = shlex.split(action["run"])
+    image, args = command[0], command[1:]
+    found = set()
+    outputs = set()
+    if image.startswith("cohortextractor"):
+        study_definition = args[args.index("--study-definition") + 1]
+        python_dependencies(
+            os.path.join("analysis", f"{study_definition}.py"), found, outputs
+        )
+    elif image.startswith("python"):
+        python_dependencies(args[0], found, outputs)
+    else:
+        r_dependencies(args[0], found, outputs)
+    # files passed as arguments, eg to the skim actions
+    outputs.update(output_pattern([arg]) for arg in args)
+    # design parameters are read by both study definitions and R scripts
+    found.update(glob.glob(os.path.join("lib", "design", "*.json")))
+    outputs.discard(None)
+    return sorted(found), sorted(outputs)
+
+
+def read_outputs(paths, patterns):
+    # the paths that match a pattern, as a file or as a directory the action refers to.
+    # if the action doesn't refer to any of them, it may build their paths in a way that can't be seen, so all of them
+    read = [
+        path
+        for path in paths
+        if any(
+            fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(path, f"{pattern}/*")
+            for pattern in patterns
+        )
+    ]
+    return read or paths
+
+
+############################################################
+## action cache
+
+
+def action_key(name, actions):
+    action = actions[name]
+    sha = hashlib.sha1()
+    sha.update(action["run"].encode())
+    sources, output_patterns = source_dependencies(action)
+    for path in sources:
+        sha.update(f"source {path} {file_sha(path)}\n".encode())
+    # only the output files of its needs that the action reads
+    for need in action["needs"]:
+        for path in read_outputs(action_outputs(actions[need]), output_patterns):
+            sha.update(f"input {path} {file_sha(path)}\n".encode())
+    return sha.hexdigest()
+
+
+def manifest_path(name):
+    return os.path.join(cache_dir, "actions", f"{name}.json")
+
+
+def object_path(sha):
+    return os.path.join(cache_dir, "objects", sha[:2], sha)
+
+
+def read_manifest(name):
+    try:
+        with open(manifest_path(name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(name, key, action, duration):
+    outputs = {}
+    for path in action_outputs(action):
+        sha = file_sha(path)
+        outputs[path] = sha
+        if not os.path.exists(object_path(sha)):
+            os.makedirs(os.path.dirname(object_path(sha)), exist_ok=True)
+            shutil.copy2(path, object_path(sha))
+    os.makedirs(os.path.dirname(manifest_path(name)), exist_ok=True)
+    with open(manifest_path(name), "w") as f:
+        json.dump(dict(key=key, duration=duration, outputs=outputs), f, indent=2)
+
+
+def restore_outputs(manifest):
+    # put back any cached output that's missing or has since been overwritten
+    # returns False if the cache doesn't hold all of them
+    for path, sha in manifest["outputs"].items():
+        if os.path.isfile(path) and file_sha(path) == sha:
+            continue
+        if not os.path.isfile(object_path(sha)):
+            return False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        shutil.copy2(object_path(sha), path)
+    return True
+
+
+def is_cached(name, key):
+    manifest = read_manifest(name)
+    return manifest is not None and manifest["key"] == key and restore_outputs(manifest)
+
+
+############################################################
+## run
+
+
+def exec_command(action, project):
+    command = shlex.split(action["run"])
+    image, args = command[0], command[1:]
+    if image.startswith("cohortextractor"):
+        population_size = project.get("expectations", {}).get("population_size", 1000)
+        args = [*args, f"--expectations-population={population_size}"]
+    return ["opensafely", "exec", image, *args]
+
+
+def run_action(name, actions, project, force=False):
+    # returns "cached" or "ran"; raises if the action fails
+    action = actions[name]
+    key = action_key(name, actions)
+    if not force and is_cached(name, key):
+        return "cached"
+    log_path = os.path.join(cache_dir, "logs", f"{name}.log")
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    start = time.time()
+    with open(log_path, "w") as log:
+        result = subprocess.run(
+            exec_command(action, project), stdout=log, stderr=subprocess.STDOUT
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} failed, see {log_path}")
+    write_manifest(name, key, action, duration=time.time() - start)
+    return "ran"
+
+
+############################################################
+## parallel scheduling
+# the cohort x vaxn branches, and the outcome-specific actions within them, are independent,
+# so any action whose needs have all finished can run alongside the others.
+# actions are run by a pool of threads, each of which waits on its action's `opensafely exec` process
+
+# rough peak memory (GB) of each kind of action, so memory-heavy ones aren't all started at once
+memory_hints = {
+    "match_potential_": 8,
+    "process_controlpotential_": 4,
+    "process_controlfinal_": 4,
+    "extract_": 2,
+}
+
+
+def memory_hint(name):
+    for prefix, memory in memory_hints.items():
+        if name.startswith(prefix):
+            return memory
+    return 1
+
+
+def available_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    except (ValueError, OSError, AttributeError):
+        return 8
+
+
+def run_actions(names, actions, project, jobs, memory, force=False):
+    # run actions in dependency order, as many at a time as jobs and memory allow
+    # returns the names of any actions that failed, or couldn't run because something they need failed
+    pending = list(names)
+    finished = set()
+    failed = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                needs = actions[name]["needs"]
+                if any(need in failed for need in needs):
+                    pending.remove(name)
+                    failed.add(name)
+                    print(f"{'skip':>6}  {name}")
+                    continue
+                if not all(need in finished or need not in names for need in needs):
+                    continue
+                if len(running) >= jobs:
+                    break
+                memory_used = sum(memory_hint(x) for x in running.values())
+                if running and memory_used + memory_hint(name) > memory:
+                    # leave it until more memory is free, but start any smaller ready actions that fit
+                    continue
+                pending.remove(name)
+                future = pool.submit(run_action, name, actions, project, force)
+                running[future] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    status = future.result()
+                    finished.add(name)
+                except Exception as error:
+                    status = "failed"
+                    failed.add(name)
+                    print(error, file=sys.stderr)
+                print(f"{status:>6}  {name}")
+
+    return failed
+
+
+def critical_path(names, actions):
+    # longest chain of needs, weighted by each action's duration when it last ran
+    durations = {
+        name: (read_manifest(name) or {}).get("duration") or 0 for name in names
+    }
+    longest = {}
+    for name in names:
+        needs = [need for need in actions[name]["needs"] if need in longest]
+        previous = max(needs, key=lambda need: longest[need][0], default=None)
+        length = durations[name] + (longest[previous][0] if previous else 0)
+        longest[name] = (length, previous)
+
+    # no actions, no path
+    end = max(longest, key=lambda name: longest[name][0], default=None)
+    path = []
+    while end is not None:
+        path.append(end)
+        end = longest[end][1]
+    return list(reversed(path)), durations
+
+
+def print_critical_path(names, actions, elapsed):
+    path, durations = critical_path(names, actions)
+    print("\ncritical path:")
+    for name in path:
+        print(f"{durations[name]:>8.0f}s  {name}")
+    print(f"{sum(durations[name] for name in path):>8.0f}s  critical path total")
+    print(f"{sum(durations.values()):>8.0f}s  all actions, run serially")
+    print(f"{elapsed:>8.0f}s  elapsed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("actions", nargs="*", help="actions to run (default: all)")
+    parser.add_argument("--force", action="store_true", help="ignore cached outputs")
+    parser.add_argument(
+        "--jobs", type=int, default=os.cpu_count(), help="actions to run at once"
+    )
+    parser.add_argument(
+        "--memory",
+        type=float,
+        default=available_memory(),
+        help="memory (GB) to share between running actions",
+    )
+    args = parser.parse_args()
+
+    project, actions = read_project()
+    unknown = [name for name in args.actions if name not in actions]
+    if unknown:
+        sys.exit(f"unknown actions: {', '.join(unknown)}")
+
+    names = required_actions(actions, args.actions or list(actions))
+    start = time.time()
+    failed = run_actions(
+        names, actions, project, jobs=args.jobs, memory=args.memory, force=args.force
+    )
+    print_critical_path(names, actions, elapsed=time.time() - start)
+    if failed:
+        sys.exit(f"{len(failed)} actions failed or were skipped")
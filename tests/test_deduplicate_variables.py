@@ -0,0 +1,90 @@
+import importlib.util
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pyarrow")
+cohortextractor = pytest.importorskip("cohortextractor")
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+analysis_dir = os.path.join(project_dir, "analysis")
+
+spec = importlib.util.spec_from_file_location(
+    "dummydata", os.path.join(analysis_dir, "dummy", "dummydata.py")
+)
+dummydata = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dummydata)
+
+
+@pytest.fixture
+def variables_functions(monkeypatch):
+    monkeypatch.chdir(project_dir)
+    monkeypatch.syspath_prepend(analysis_dir)
+    import variables_functions
+
+    return variables_functions
+
+
+def vaccination_query(returning, on_or_after="2020-12-01", **kwargs):
+    return cohortextractor.patients.with_vaccination_record(
+        returning=returning,
+        tpp=dict(product_name_matches="COVID-19 mRNA Vaccine Comirnaty"),
+        emis=dict(),
+        on_or_after=on_or_after,
+        find_first_match_in_period=True,
+        **kwargs,
+    )
+
+
+def test_aliased_study_definition_round_trips_through_dummy_data(variables_functions):
+    variables = variables_functions.deduplicate_variables(
+        "test",
+        dict(
+            vax_date=vaccination_query(
+                "date",
+                date_format="YYYY-MM-DD",
+                return_expectations=dict(date=dict(earliest="2021-01-01", latest="2021-12-31")),
+            ),
+            vax=vaccination_query("binary_flag"),
+            # repeats of the queries above, with their own expectations
+            outcome_vax_date=vaccination_query(
+                "date",
+                date_format="YYYY-MM-DD",
+                return_expectations=dict(date=dict(earliest="2021-06-01", latest="2021-06-30")),
+            ),
+            outcome_vax=vaccination_query("binary_flag", return_expectations=dict(incidence=0.1)),
+            # and a later event chained on the alias
+            later_vax_date=vaccination_query(
+                "date",
+                date_format="YYYY-MM-DD",
+                on_or_after="outcome_vax_date + 1 days",
+            ),
+        ),
+    )
+    assert variables["outcome_vax_date"][0] == "aggregate_of"
+    assert variables["outcome_vax"][0] == "categorised_as"
+
+    study = cohortextractor.StudyDefinition(
+        default_expectations=dict(
+            date=dict(earliest="2021-01-01", latest="2021-12-31"),
+            rate="uniform",
+            incidence=0.5,
+        ),
+        index_date="2021-09-20",
+        population=cohortextractor.patients.all(),
+        **variables,
+    )
+    table = dummydata.generate_dataset(study, n=500, seed=1, index_date="2021-09-20")
+
+    # each alias has the type and values of the variable it repeats
+    for alias, variable in (("outcome_vax_date", "vax_date"), ("outcome_vax", "vax")):
+        assert table.schema.field(alias).type == table.schema.field(variable).type
+        assert table.column(alias).equals(table.column(variable))
+
+    later = table.column("later_vax_date").to_pylist()
+    alias = table.column("outcome_vax_date").to_pylist()
+    assert all(
+        later_date is None or (alias_date is not None and later_date > alias_date)
+        for later_date, alias_date in zip(later, alias)
+    )
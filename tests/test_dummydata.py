@@ -0,0 +1,115 @@
+import csv
+import gzip
+import importlib
+import importlib.util
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pyarrow")
+cohortextractor = pytest.importorskip("cohortextractor")
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+analysis_dir = os.path.join(project_dir, "analysis")
+
+spec = importlib.util.spec_from_file_location(
+    "dummydata", os.path.join(analysis_dir, "dummy", "dummydata.py")
+)
+dummydata = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dummydata)
+
+
+# every study definition, with the parameters its actions in project.yaml pass it
+study_definitions = dict(
+    study_definition_treated=dict(cohort="over12", vaxn="1"),
+    study_definition_controlpotential=dict(
+        cohort="over12", vaxn="1", matching_round="2", index_date="2021-10-04"
+    ),
+    study_definition_controlactual=dict(cohort="over12", vaxn="1", matching_round="2"),
+    study_definition_controlfinal=dict(cohort="over12", vaxn="1", n_matching_rounds="6"),
+    study_definition_covidtests=dict(cohort="over12", vaxn="1", arm="treated"),
+    study_definition_carditis_severity=dict(
+        cohort="over12", vaxn="1", carditis_type="peri"
+    ),
+)
+
+# the files written by earlier actions that the study definitions read
+input_files = [
+    "output/over12/vax1/matchround1/actual/matchedcontrols.csv.gz",
+    "output/over12/vax1/matchround2/potential/potential_matchedcontrols.csv.gz",
+    "output/over12/vax1/matchround6/actual/cumulative_matchedcontrols.csv.gz",
+    "output/over12/vax1/match/data_matched_treated.csv.gz",
+    "output/over12/vax1/carditis_severity/pericarditis_dates.csv",
+]
+
+
+def write_input_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["patient_id", "trial_date", "match_id", "pericarditis_date"])
+        writer.writerow([1, "2021-10-04", 1, "2021-10-11"])
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # the study definitions read lib/ and codelists/ relative to the project root,
+    # and files from earlier actions in output/, so they're run in a copy of the root with those files
+    for name in ("analysis", "lib", "codelists"):
+        os.symlink(os.path.join(project_dir, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    for path in input_files:
+        write_input_file(path)
+    monkeypatch.syspath_prepend(analysis_dir)
+    return tmp_path
+
+
+def import_study(name, params):
+    # study definitions are configured when they're imported, so each is imported afresh
+    cohortextractor.params.clear()
+    cohortextractor.params.update(params)
+    for module in list(sys.modules):
+        if module.startswith(("study_definition_", "variables_")):
+            del sys.modules[module]
+    return importlib.import_module(name).study
+
+
+@pytest.mark.parametrize("name", study_definitions)
+def test_generate_dataset_for_study_definition(project, name):
+    study = import_study(name, study_definitions[name])
+    table = dummydata.generate_dataset(study, n=200, seed=1, index_date="2021-10-04")
+
+    variables, hidden = dummydata.study_variables(study)
+    assert table.num_rows == 200
+    assert set(table.column_names) == {"patient_id", *variables} - hidden
+
+    # every column has the type of the kind of variable it is
+    for column in table.column_names[1:]:
+        funcname, kwargs = variables[column]
+        if funcname == "fixed_value":
+            continue
+        kind = dummydata.column_kind(funcname, kwargs, variables)
+        type_check = dict(
+            date=lambda type: str(type).startswith("date"),
+            category=lambda type: str(type).startswith("dictionary"),
+            int=lambda type: str(type).startswith("int"),
+            float=lambda type: str(type) == "double",
+            bool=lambda type: str(type) == "bool",
+        )[kind]
+        assert type_check(table.schema.field(column).type), (column, kind)
+
+
+def test_column_kind_of_aggregate_is_kind_of_source():
+    variables = dict(
+        a_date=("with_vaccination_record", dict(returning="date", date_format="YYYY-MM-DD")),
+        b_date=("with_vaccination_record", dict(returning="date", date_format="YYYY-MM-DD")),
+        n=("with_these_clinical_events", dict(returning="number_of_matches_in_period")),
+    )
+    minimum_date = cohortextractor.patients.minimum_of("a_date", "b_date")
+    maximum_number = cohortextractor.patients.maximum_of("n")
+
+    assert dummydata.column_kind(*minimum_date, variables) == "date"
+    assert dummydata.column_kind(*maximum_number, variables) == "int"
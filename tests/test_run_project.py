@@ -0,0 +1,177 @@
+import importlib.util
+import os
+import textwrap
+import threading
+import time
+
+import pytest
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+spec = importlib.util.spec_from_file_location(
+    "run_project", os.path.join(project_dir, "run-project.py")
+)
+run_project = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(run_project)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(textwrap.dedent(text))
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # process_treated writes the eligible treated people with and without the outcome variables,
+    # the matching reads the file without them, and the final processing reads the one with them
+    monkeypatch.chdir(tmp_path)
+    write(
+        "project.yaml",
+        """
+        version: '3.0'
+        actions:
+          process_treated_over12_1:
+            run: r:latest analysis/process_treated.R over12 1
+            outputs:
+              highly_sensitive:
+                rds: output/over12/vax1/treated/*.rds
+          match_potential_over12_1_1:
+            run: r:latest analysis/match_potential.R over12 1 1
+            needs:
+            - process_treated_over12_1
+            outputs:
+              highly_sensitive:
+                rds: output/over12/vax1/matchround1/potential/*.rds
+          process_controlfinal_over12_1:
+            run: r:latest analysis/process_controlfinal.R over12 1
+            needs:
+            - process_treated_over12_1
+            outputs:
+              highly_sensitive:
+                rds: output/over12/vax1/match/*.rds
+          skim_over12_1_treated:
+            run: r:latest analysis/skim.R output/over12/vax1/treated/data_treatedeligible.rds
+            needs:
+            - process_treated_over12_1
+            outputs:
+              moderately_sensitive:
+                txt: output/over12/vax1/skim/*.txt
+          table1_over12_1:
+            run: r:latest analysis/table1.R over12 1
+            needs:
+            - process_treated_over12_1
+            outputs:
+              moderately_sensitive:
+                csv: output/over12/vax1/table1/*.csv
+        """,
+    )
+    write("analysis/process_treated.R", "# writes the treated files\n")
+    write(
+        "analysis/match_potential.R",
+        """
+        source(here("lib", "functions", "data_access.R"))
+        data_alltreated <- read_rds(ghere("output", cohort, "vax{vaxn}", "treated", "data_treatedmatching.rds"))
+        fs::dir_create(ghere("output", cohort, "vax{vaxn}", glue("matchround", matching_round), "potential"))
+        """,
+    )
+    write(
+        "analysis/process_controlfinal.R",
+        """
+        data_treatedeligible <- read_rds(ghere("output", cohort, "vax{vaxn}", "treated", "data_treatedeligible.rds"))
+        """,
+    )
+    write("analysis/skim.R", "data <- read_rds(args[[1]])\n")
+    write("analysis/table1.R", "data <- read_rds(treated_path(cohort, vaxn))\n")
+    write("lib/functions/data_access.R", "# data access functions\n")
+    write("output/over12/vax1/treated/data_treatedeligible.rds", "matching and outcome variables")
+    write("output/over12/vax1/treated/data_treatedmatching.rds", "matching variables")
+    return run_project.read_project()[1]
+
+
+def keys(actions):
+    return {name: run_project.action_key(name, actions) for name in actions}
+
+
+def test_outcome_only_change_leaves_matching_cached(project):
+    before = keys(project)
+    write("output/over12/vax1/treated/data_treatedeligible.rds", "matching and new outcome variables")
+    after = keys(project)
+
+    assert after["match_potential_over12_1_1"] == before["match_potential_over12_1_1"]
+    assert after["process_controlfinal_over12_1"] != before["process_controlfinal_over12_1"]
+    # files passed as arguments are read too
+    assert after["skim_over12_1_treated"] != before["skim_over12_1_treated"]
+    # an action that refers to none of a need's outputs by path may read any of them
+    assert after["table1_over12_1"] != before["table1_over12_1"]
+
+
+def test_matching_change_reruns_matching(project):
+    before = keys(project)
+    write("output/over12/vax1/treated/data_treatedmatching.rds", "new matching variables")
+    after = keys(project)
+
+    assert after["match_potential_over12_1_1"] != before["match_potential_over12_1_1"]
+    assert after["process_controlfinal_over12_1"] == before["process_controlfinal_over12_1"]
+
+
+def test_output_patterns_from_source(project):
+    _, patterns = run_project.source_dependencies(project["match_potential_over12_1_1"])
+
+    assert "output/*/vax*/treated/data_treatedmatching.rds" in patterns
+    assert "output/*/vax*/*/potential" in patterns
+
+
+def scheduling_actions(*names):
+    return {name: dict(needs=[], output_patterns=[]) for name in names}
+
+
+def test_smaller_actions_start_while_a_large_one_waits_for_memory(monkeypatch):
+    # two 8GB matching actions and two small ones in 9GB: the second matching action has to wait,
+    # but the small action behind it fits alongside the first
+    actions = scheduling_actions(
+        "match_potential_a", "match_potential_b", "table1_a", "table1_b"
+    )
+    started = []
+    small_started = threading.Event()
+
+    def run_action(name, actions, project, force=False):
+        started.append(name)
+        if name == "table1_a":
+            small_started.set()
+        if name == "match_potential_a":
+            # only finishes once the small action has started alongside it, or times out
+            assert small_started.wait(timeout=5)
+        return "ran"
+
+    monkeypatch.setattr(run_project, "run_action", run_action)
+    failed = run_project.run_actions(list(actions), actions, {}, jobs=4, memory=9)
+
+    assert failed == set()
+    assert started[:2] == ["match_potential_a", "table1_a"]
+    assert sorted(started) == sorted(actions)
+
+
+def test_jobs_limit_stops_the_scan(monkeypatch):
+    actions = scheduling_actions("table1_a", "table1_b", "table1_c")
+    running = []
+    most_running = []
+    lock = threading.Lock()
+
+    def run_action(name, actions, project, force=False):
+        with lock:
+            running.append(name)
+            most_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(name)
+        return "ran"
+
+    monkeypatch.setattr(run_project, "run_action", run_action)
+    run_project.run_actions(list(actions), actions, {}, jobs=1, memory=100)
+
+    assert max(most_running) == 1
+
+
+def test_critical_path_of_no_actions():
+    assert run_project.critical_path([], {}) == ([], {})